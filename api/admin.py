@@ -10,6 +10,9 @@ from .models import(
     OrderItem,
     Favorite,
     Review,
+    OutboundEmail,
+    ImportJob,
+    StockReservation,
 )
 
 
@@ -22,12 +25,27 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class ItemAdmin(admin.ModelAdmin):
+    #kept by conditional updates elsewhere, a full-row save would write back the copies read when the form loaded
+    readonly_fields = ('rating_count', 'rating_sum', 'rating_average', 'rating_histogram', 'stock', 'stock_shards')
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            obj.save(update_fields=[*form.changed_data, 'updated_at'])
+        else:
+            obj.save()
+
+
+#list_select_related covers the relations each model's __str__ walks on the changelist
 admin.site.register(OrderItem)
 admin.site.register(User, UserAdmin)
-admin.site.register(Item)
+admin.site.register(Item, ItemAdmin)
 admin.site.register(Order)
 admin.site.register(Profile)
-admin.site.register(Cart)
-admin.site.register(CartItem)
-admin.site.register(Favorite)
-admin.site.register(Review)
\ No newline at end of file
+admin.site.register(Cart, list_select_related=('user',))
+admin.site.register(CartItem, list_select_related=('item',))
+admin.site.register(Favorite, list_select_related=('user', 'item'))
+admin.site.register(Review, list_select_related=('user', 'item'))
+admin.site.register(OutboundEmail, list_display=('to', 'subject', 'status', 'attempts', 'next_attempt_at'), list_filter=('status',))
+admin.site.register(ImportJob, list_display=('seller', 'format', 'status', 'rows_done', 'error_count', 'created_at'), list_filter=('status',))
+admin.site.register(StockReservation, list_display=('item', 'shard', 'user', 'quantity', 'expires_at'), list_select_related=('item', 'user'))
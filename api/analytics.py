@@ -0,0 +1,132 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import OrderItem, SalesRollup
+from .search import chunked
+
+
+UPSERT_VENDORS = {'sqlite', 'postgresql'}
+PERIODS = [SalesRollup.DAY, SalesRollup.WEEK, SalesRollup.MONTH]
+#how far back the dashboard looks when no start is given
+DEFAULT_SPAN = {SalesRollup.DAY: 30, SalesRollup.WEEK: 12, SalesRollup.MONTH: 12}
+
+
+def period_start(day, period):
+    if period == SalesRollup.WEEK:
+        return day - timedelta(days=day.weekday())
+    if period == SalesRollup.MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def default_start(end, period):
+    span = DEFAULT_SPAN[period]
+    if period == SalesRollup.MONTH:
+        start = period_start(end, period)
+        for _ in range(span - 1):
+            start = period_start(start - timedelta(days=1), period)
+        return start
+    step = 7 if period == SalesRollup.WEEK else 1
+    return period_start(end, period) - timedelta(days=step * (span - 1))
+
+
+def rollup_deltas(sales):
+    """
+    Fold ``(sold_at, seller_id, item_id, quantity, unit_price)`` rows into
+    ``{(seller_id, period, period_start, item_id): [units, revenue]}`` for
+    every period.
+    """
+    deltas = defaultdict(lambda: [0, Decimal('0')])
+    for sold_at, seller_id, item_id, quantity, unit_price in sales:
+        day = timezone.localdate(sold_at)
+        for period in PERIODS:
+            delta = deltas[(seller_id, period, period_start(day, period), item_id)]
+            delta[0] += quantity
+            delta[1] += quantity * unit_price
+    return deltas
+
+
+def apply_deltas(deltas):
+    """
+    Add the deltas onto the rollup rows with one INSERT ... ON CONFLICT per
+    row, so concurrent checkouts for the same item and day never lose sales.
+    """
+    if not deltas:
+        return
+    table = SalesRollup._meta.db_table
+    rows = [(*key, units, revenue) for key, (units, revenue) in deltas.items()]
+    if connection.vendor in UPSERT_VENDORS:
+        adapt = connection.ops.adapt_datefield_value
+        rows = [(seller_id, period, adapt(start), *rest) for seller_id, period, start, *rest in rows]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {table} (seller_id, period, period_start, item_id, units, revenue) '
+                'VALUES (%s, %s, %s, %s, %s, %s) '
+                'ON CONFLICT (seller_id, period, period_start, item_id) DO UPDATE SET '
+                f'units = {table}.units + excluded.units, revenue = {table}.revenue + excluded.revenue',
+                rows,
+            )
+        return
+    for seller_id, period, start, item_id, units, revenue in rows:
+        with transaction.atomic():
+            lines = SalesRollup.objects.filter(seller_id=seller_id, period=period, period_start=start, item_id=item_id)
+            if not lines.update(units=F('units') + units, revenue=F('revenue') + revenue):
+                SalesRollup.objects.create(
+                    seller_id=seller_id, period=period, period_start=start, item_id=item_id, units=units, revenue=revenue,
+                )
+
+
+def record_order(order, order_items):
+    #called inside checkout's transaction with the new lines and their items already loaded
+    apply_deltas(rollup_deltas(
+        (order.created_at, line.item.seller_id, line.item_id, line.quantity, line.unit_price) for line in order_items
+    ))
+
+
+def rebuild_rollups(chunk_size=5000):
+    """
+    Recompute every rollup from the order history, streaming order lines in
+    chunks so memory is bounded by the distinct keys of one chunk.
+    """
+    sales = (
+        OrderItem.objects
+        .order_by('pk')
+        .values_list('order__created_at', 'item__seller_id', 'item_id', 'quantity', 'unit_price')
+        .iterator(chunk_size=chunk_size)
+    )
+    lines = 0
+    with transaction.atomic():
+        SalesRollup.objects.all().delete()
+        for batch in chunked(sales, chunk_size):
+            apply_deltas(rollup_deltas(batch))
+            lines += len(batch)
+    return lines
+
+
+def seller_dashboard(seller_id, period, start, end, top=10):
+    """
+    Revenue and units per period between ``start`` and ``end`` (inclusive)
+    plus the best selling items over the range. Both queries read only the
+    rollup rows of the range, however long the order history is.
+    """
+    rows = SalesRollup.objects.filter(
+        seller_id=seller_id, period=period, period_start__gte=period_start(start, period), period_start__lte=end,
+    )
+    series = rows.values('period_start').annotate(units=Sum('units'), revenue=Sum('revenue')).order_by('period_start')
+    top_items = (
+        rows.values('item_id', name=F('item__name'))
+        .annotate(units=Sum('units'), revenue=Sum('revenue'))
+        .order_by('-revenue', 'item_id')[:top]
+    )
+    return {
+        'period': period,
+        'start': period_start(start, period),
+        'end': end,
+        'series': list(series),
+        'top_items': list(top_items),
+    }
@@ -0,0 +1,97 @@
+import base64
+import binascii
+
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework.utils.urls import replace_query_param
+
+from .conditional import make_etag, not_modified, serializer_version, set_validators
+from .models import Item, Review
+from .renderers import json_response
+from .serializers import ItemSerializer, ReviewSerializer
+
+
+class AsyncReadView(View):
+    """
+    ASGI-native read-only list/retrieve for a model. Rows are fetched with the
+    async ORM and paged newest first on the primary key with an opaque cursor,
+    mirroring the ``KeysetPagination`` used by the DRF viewsets. Search and
+    filtering stay on the regular viewsets. Conditional requests are answered
+    the same way as ``ConditionalGetMixin`` does.
+    """
+    model = None
+    serializer_class = None
+    page_size = 50
+    max_page_size = 200
+
+    async def get(self, request, pk=None):
+        if pk is not None:
+            return await self.retrieve(request, pk)
+        return await self.list(request)
+
+    async def retrieve(self, request, pk):
+        try:
+            instance = await self.model.objects.aget(pk=pk)
+        except self.model.DoesNotExist:
+            raise Http404
+        etag = make_etag(serializer_version(self.serializer_class), 'json', instance.pk, instance.updated_at)
+        response = not_modified(request, set_validators(HttpResponse(), etag, instance.updated_at))
+        if response is not None:
+            return response
+        return set_validators(json_response(self.serializer_class(instance).data), etag, instance.updated_at)
+
+    async def list(self, request):
+        try:
+            after = self.decode_cursor(request.GET.get('cursor'))
+        except ValueError:
+            return json_response({'detail': 'Invalid cursor'}, status=404)
+        page_size = self.get_page_size(request)
+        queryset = self.model.objects.order_by('-pk')
+        if after is not None:
+            queryset = queryset.filter(pk__lt=after)
+        rows = [row async for row in queryset[:page_size + 1]]
+        page = rows[:page_size]
+        next_url = None
+        if len(rows) > page_size:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', self.encode_cursor(page[-1].pk))
+        etag = make_etag(
+            serializer_version(self.serializer_class), 'json', [(row.pk, row.updated_at) for row in page], next_url,
+        )
+        response = not_modified(request, set_validators(HttpResponse(), etag))
+        if response is not None:
+            return response
+        return set_validators(json_response({
+            'next': next_url,
+            'results': self.serializer_class(page, many=True).data,
+        }), etag)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.GET['page_size'])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    def encode_cursor(self, pk):
+        return base64.urlsafe_b64encode(f'pk={pk}'.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            key, _, value = base64.urlsafe_b64decode(cursor.encode()).decode().partition('=')
+        except (binascii.Error, UnicodeDecodeError):
+            raise ValueError(cursor)
+        if key != 'pk':
+            raise ValueError(cursor)
+        return int(value)
+
+
+class AsyncItemView(AsyncReadView):
+    model = Item
+    serializer_class = ItemSerializer
+
+
+class AsyncReviewView(AsyncReadView):
+    model = Review
+    serializer_class = ReviewSerializer
@@ -0,0 +1,148 @@
+import copy
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db.models import F
+from django.utils.functional import SimpleLazyObject
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import LRUCache
+from .models import User
+
+
+DEFAULTS = {
+    #alias from CACHES shared by all workers, a revocation then reaches every worker at once
+    'SHARED_CACHE': None,
+    'SHARED_VERSION_TIMEOUT': 300,
+    #without one each worker caches versions itself and may honour a revoked token for this long
+    'LOCAL_VERSION_TIMEOUT': 5,
+}
+
+CLAIM_FIELDS = ['is_seller', 'is_verified', 'is_staff']
+VERSION_CLAIM = 'ver'
+USER_ROW_TIMEOUT = 30
+
+user_rows = LRUCache(max_entries=4096)
+local_versions = LRUCache(max_entries=4096)
+
+
+def auth_settings():
+    return {**DEFAULTS, **getattr(settings, 'TOKEN_AUTH', {})}
+
+
+def version_cache():
+    """The cache holding token versions and how long an entry may live there."""
+    config = auth_settings()
+    if config['SHARED_CACHE']:
+        return caches[config['SHARED_CACHE']], config['SHARED_VERSION_TIMEOUT']
+    return local_versions, config['LOCAL_VERSION_TIMEOUT']
+
+
+def version_key(user_id):
+    return f'auth:token-version:{user_id}'
+
+
+def token_version(user_id):
+    versions, timeout = version_cache()
+    version = versions.get(version_key(user_id))
+    if version is None:
+        version = User.objects.filter(pk=user_id).values_list('token_version', flat=True).first()
+        if version is not None:
+            versions.set(version_key(user_id), version, timeout)
+    return version
+
+
+def load_user(user_id):
+    user = user_rows.get(user_id)
+    if user is None:
+        user = User.objects.get(pk=user_id)
+        user_rows.set(user_id, user, USER_ROW_TIMEOUT)
+    #requests get their own copy so nobody mutates the cached row
+    return copy.copy(user)
+
+
+def forget_user(user_id):
+    version_cache()[0].delete(version_key(user_id))
+    user_rows.delete(user_id)
+
+
+def revoke_tokens(user):
+    User.objects.filter(pk=user.pk).update(token_version=F('token_version') + 1)
+    forget_user(user.pk)
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    The authenticated user as described by the token claims. Permission checks
+    on ``is_seller``, ``is_verified`` and ``is_staff`` are answered from the
+    token; anything else, including using it as a model instance, loads the
+    ``User`` row through a short-lived in-process cache.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id, token):
+        self.__dict__['user_id'] = user_id
+        self.__dict__['token'] = token
+        super().__init__(lambda: load_user(user_id))
+
+    def __bool__(self):
+        return True
+
+    @property
+    def id(self):
+        return self.__dict__['user_id']
+
+    pk = id
+
+    @property
+    def is_seller(self):
+        return self.__dict__['token']['is_seller']
+
+    @property
+    def is_verified(self):
+        return self.__dict__['token']['is_verified']
+
+    @property
+    def is_staff(self):
+        return self.__dict__['token']['is_staff']
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that trusts the role claims in the token instead of
+    fetching the user row. Revocation is a per-user ``token_version`` kept in
+    the ``TOKEN_AUTH`` version cache, so a revoked token stops working at once
+    with a shared cache and within ``LOCAL_VERSION_TIMEOUT`` seconds on other
+    workers without one. Tokens minted before the claims existed are handled
+    the stock way.
+    """
+
+    def get_user(self, validated_token):
+        if VERSION_CLAIM not in validated_token or not all(field in validated_token for field in CLAIM_FIELDS):
+            return super().get_user(validated_token)
+        try:
+            user_id = User._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, ValidationError):
+            raise InvalidToken('Token contained no recognizable user identification')
+        version = token_version(user_id)
+        if version is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        if validated_token[VERSION_CLAIM] != version:
+            raise AuthenticationFailed('Token has been revoked', code='token_revoked')
+        return ClaimsUser(user_id, validated_token)
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for field in CLAIM_FIELDS:
+            token[field] = getattr(user, field)
+        token[VERSION_CLAIM] = user.token_version
+        return token
@@ -0,0 +1,218 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework import status
+from rest_framework.response import Response
+
+from .conditional import not_modified, serializer_version
+
+
+DEFAULTS = {
+    'ENABLED': True,
+    'TIMEOUT': 300,
+    'LOCAL_MAX_ENTRIES': 1024,
+    'SHARED_CACHE': None,
+    'KEY_PREFIX': 'catalog',
+}
+
+
+def cache_settings():
+    return {**DEFAULTS, **getattr(settings, 'CATALOG_CACHE', {})}
+
+
+#in-process lru tier
+class LRUCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ResponseCache:
+    """
+    Two-tier versioned cache for read-only API responses.
+
+    Every cached entry lives under a namespace (``item:list``, ``item:42``)
+    whose version number is part of the key, so invalidating a namespace is
+    a single counter bump; stale entries simply stop being addressed and age
+    out of the LRU. Versions live in the shared tier when one is configured,
+    which keeps invalidation consistent across worker processes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.config = cache_settings()
+        self.local = LRUCache(self.config['LOCAL_MAX_ENTRIES'])
+        alias = self.config['SHARED_CACHE']
+        self.shared = caches[alias] if alias else None
+        self._versions = {}
+        self.counters = {'hits': 0, 'misses': 0, 'local_hits': 0, 'shared_hits': 0, 'invalidations': 0}
+
+    clear = reset
+
+    @property
+    def enabled(self):
+        return self.config['ENABLED']
+
+    def _count(self, *names):
+        with self._lock:
+            for name in names:
+                self.counters[name] += 1
+
+    def _version_key(self, namespace):
+        return f"{self.config['KEY_PREFIX']}:v:{namespace}"
+
+    def versions(self, namespaces):
+        if self.shared is None:
+            return [self._versions.get(namespace, 0) for namespace in namespaces]
+        keys = [self._version_key(namespace) for namespace in namespaces]
+        found = self.shared.get_many(keys)
+        return [found.get(key, 0) for key in keys]
+
+    def bump(self, *namespaces):
+        for namespace in namespaces:
+            if self.shared is None:
+                with self._lock:
+                    self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            else:
+                key = self._version_key(namespace)
+                self.shared.add(key, 0, timeout=None)
+                self.shared.incr(key)
+            self._count('invalidations')
+
+    def make_key(self, namespaces, parts):
+        versions = self.versions(namespaces)
+        raw = '|'.join([*(f'{n}@{v}' for n, v in zip(namespaces, versions)), *parts])
+        digest = hashlib.md5(raw.encode()).hexdigest()
+        return f"{self.config['KEY_PREFIX']}:r:{digest}"
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is not None:
+            self._count('hits', 'local_hits')
+            return value
+        if self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.local.set(key, value, self.config['TIMEOUT'])
+                self._count('hits', 'shared_hits')
+                return value
+        self._count('misses')
+        return None
+
+    def set(self, key, value):
+        self.local.set(key, value, self.config['TIMEOUT'])
+        if self.shared is not None:
+            self.shared.set(key, value, self.config['TIMEOUT'])
+
+    def stats(self):
+        with self._lock:
+            return {**self.counters, 'local_entries': len(self.local)}
+
+
+response_cache = ResponseCache()
+
+
+@receiver(setting_changed)
+def reset_response_cache(setting, **kwargs):
+    if setting in ('CATALOG_CACHE', 'CACHES'):
+        response_cache.reset()
+
+
+VALIDATOR_HEADERS = ['ETag', 'Last-Modified']
+
+
+def invalidate_all(namespace):
+    #for bulk writes that bypass model signals
+    response_cache.bump(f'{namespace}:*')
+
+
+def invalidate_object(namespace, pk=None):
+    #a new row can only show up in list pages; a changed or deleted row also stales its detail page
+    if pk is None:
+        response_cache.bump(f'{namespace}:list')
+    else:
+        response_cache.bump(f'{namespace}:list', f'{namespace}:{pk}')
+
+
+class CachedResponseMixin:
+    """
+    Read-through caching for ``list`` and ``retrieve``. The viewset names its
+    ``cache_namespace`` and whoever writes the model calls ``invalidate_object``,
+    or ``invalidate_all`` after a bulk write. Validator headers are cached with
+    the data, so a conditional request that hits answers 304 without the database.
+    """
+    cache_namespace = None
+
+    def _cache_key(self, request, namespace):
+        query = sorted(request.query_params.lists())
+        parts = [
+            serializer_version(self.get_serializer_class()),
+            request.get_host(),
+            request.accepted_renderer.format,
+            repr(query),
+        ]
+        return response_cache.make_key([f'{self.cache_namespace}:*', namespace], parts)
+
+    def _cached(self, request, namespace, handler, *args, **kwargs):
+        if not response_cache.enabled:
+            return handler(request, *args, **kwargs)
+        key = self._cache_key(request, namespace)
+        entry = response_cache.get(key)
+        if entry is not None:
+            data, headers = entry
+            response = Response(data, headers=headers)
+            response['X-Cache'] = 'HIT'
+            return not_modified(request, response) or response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            headers = {name: response[name] for name in VALIDATOR_HEADERS if name in response}
+            response_cache.set(key, (response.data, headers))
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(request, f'{self.cache_namespace}:list', super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        namespace = f"{self.cache_namespace}:{kwargs[self.lookup_url_kwarg or self.lookup_field]}"
+        return self._cached(request, namespace, super().retrieve, *args, **kwargs)
@@ -0,0 +1,79 @@
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from .models import CartItem
+
+
+#vendors with INSERT ... ON CONFLICT, and their two-argument minimum
+UPSERT_VENDORS = {'sqlite': 'MIN', 'postgresql': 'LEAST'}
+#per line, so quantity times price stays a small exact number on every backend
+MAX_LINE_QUANTITY = 10_000
+
+
+def upsert_lines(cart_id, quantities, increment):
+    """
+    Write ``{item_id: quantity}`` into a cart with one INSERT ... ON CONFLICT
+    per line, either adding to or replacing the quantity already there. The
+    database applies the increment, so concurrent adds never lose updates.
+    A line never goes past ``MAX_LINE_QUANTITY``; more is clamped to it.
+    """
+    if not quantities:
+        return
+    now = timezone.now()
+    table = CartItem._meta.db_table
+    if connection.vendor in UPSERT_VENDORS:
+        #raw sql skips auto_now, so stamp updated_at by hand
+        stamp = connection.ops.adapt_datetimefield_value(now)
+        rows = [(cart_id, item_id, min(quantity, MAX_LINE_QUANTITY), stamp) for item_id, quantity in quantities.items()]
+        least = UPSERT_VENDORS[connection.vendor]
+        new_quantity = f'{least}({table}.quantity + excluded.quantity, {MAX_LINE_QUANTITY})' if increment else 'excluded.quantity'
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {table} (cart_id, item_id, quantity, updated_at) VALUES (%s, %s, %s, %s) '
+                f'ON CONFLICT (cart_id, item_id) DO UPDATE SET quantity = {new_quantity}, updated_at = excluded.updated_at',
+                rows,
+            )
+        return
+    for item_id, quantity in quantities.items():
+        quantity = min(quantity, MAX_LINE_QUANTITY)
+        with transaction.atomic():
+            lines = CartItem.objects.filter(cart_id=cart_id, item_id=item_id)
+            new_quantity = Least(F('quantity') + quantity, MAX_LINE_QUANTITY) if increment else quantity
+            if not lines.update(quantity=new_quantity, updated_at=now):
+                CartItem.objects.create(cart_id=cart_id, item_id=item_id, quantity=quantity)
+
+
+def fold_operations(operations):
+    """
+    Reduce an ordered list of add/set/remove operations to the net effect per
+    item: ``('add', n)`` on top of whatever is in the cart, ``('set', n)`` or
+    ``('remove', None)``.
+    """
+    net = {}
+    for operation in operations:
+        op, item_id, quantity = operation['op'], operation['item_id'], operation.get('quantity')
+        current_op, current_quantity = net.get(item_id, ('add', 0))
+        if op == 'add':
+            if current_op == 'remove':
+                net[item_id] = ('set', quantity)
+            else:
+                net[item_id] = (current_op, current_quantity + quantity)
+        elif op == 'set' and quantity:
+            net[item_id] = ('set', quantity)
+        else:
+            net[item_id] = ('remove', None)
+    return net
+
+
+def apply_operations(cart_id, operations):
+    net = fold_operations(operations)
+    removed = [item_id for item_id, (op, _) in net.items() if op == 'remove']
+    added = {item_id: quantity for item_id, (op, quantity) in net.items() if op == 'add' and quantity}
+    replaced = {item_id: quantity for item_id, (op, quantity) in net.items() if op == 'set'}
+    with transaction.atomic():
+        if removed:
+            CartItem.objects.filter(cart_id=cart_id, item_id__in=removed).delete()
+        upsert_lines(cart_id, added, increment=True)
+        upsert_lines(cart_id, replaced, increment=False)
@@ -0,0 +1,84 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework.response import Response
+
+
+def serializer_version(serializer_class):
+    fields = getattr(serializer_class.Meta, 'fields', ())
+    return f"{serializer_class.__name__}.{getattr(serializer_class, 'cache_version', 1)}.{','.join(fields)}"
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(repr(parts).encode()).hexdigest())
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+def not_modified(request, response):
+    """
+    The 304 for ``response`` when the request's ``If-None-Match`` or
+    ``If-Modified-Since`` matches its validators, otherwise None. Only the
+    headers are looked at, so the body need not have been rendered.
+    """
+    last_modified = response.get('Last-Modified')
+    result = get_conditional_response(
+        request,
+        etag=response.get('ETag'),
+        last_modified=last_modified and parse_http_date_safe(last_modified),
+        response=response,
+    )
+    return result if result is not response else None
+
+
+def is_conditional(request):
+    return 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+
+
+class ConditionalGetMixin:
+    """
+    ETag and Last-Modified validators for ``list`` and ``retrieve``, computed
+    from the primary keys and ``updated_at`` of the rows that would be
+    rendered. A matching conditional request gets a 304 after the one query
+    that fetches those rows, before anything is serialized. Lists carry only
+    an ETag: a deleted row does not move the newest ``updated_at``.
+    """
+
+    def representation(self, request):
+        return [serializer_version(self.get_serializer_class()), request.accepted_renderer.format]
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+        parts = [*self.representation(request), [self.row_version(row) for row in rows]]
+        if page is not None:
+            parts += [self.paginator.get_next_link(), self.paginator.get_previous_link()]
+        etag = make_etag(*parts)
+        response = not_modified(request, set_validators(Response(), etag))
+        if response is not None:
+            return response
+        data = self.serialize_list(rows)
+        if page is None:
+            return set_validators(Response(data), etag)
+        return set_validators(self.get_paginated_response(data), etag)
+
+    def row_version(self, row):
+        return row.pk, row.updated_at
+
+    def serialize_list(self, rows):
+        return self.get_serializer(rows, many=True).data
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = make_etag(*self.representation(request), instance.pk, instance.updated_at)
+        response = not_modified(request, set_validators(Response(), etag, instance.updated_at))
+        if response is not None:
+            return response
+        return set_validators(Response(self.get_serializer(instance).data), etag, instance.updated_at)
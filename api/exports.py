@@ -0,0 +1,126 @@
+import csv
+import io
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Item, OrderItem
+
+
+CHUNK_SIZE = 2000
+FLUSH_BYTES = 64 * 1024
+
+#one row per order line, flattened so accounting gets a single table
+ORDER_COLUMNS = {
+    'order_id': 'order_id',
+    'created_at': 'order__created_at',
+    'customer_id': 'order__customer_id',
+    'line_id': 'id',
+    'item_id': 'item_id',
+    'seller_id': 'item__seller_id',
+    'quantity': 'quantity',
+    'unit_price': 'unit_price',
+}
+
+ITEM_COLUMNS = {
+    'id': 'id',
+    'sku': 'sku',
+    'name': 'name',
+    'description': 'description',
+    'price': 'price',
+    'seller_id': 'seller_id',
+    'rating_count': 'rating_count',
+    'rating_average': 'rating_average',
+    'updated_at': 'updated_at',
+}
+
+EXPORTS = {
+    # name: (queryset, columns, timestamp lookup, seller lookup)
+    'orders': (lambda: OrderItem.objects.order_by('order_id', 'id'), ORDER_COLUMNS, 'order__created_at', 'item__seller_id'),
+    'items': (lambda: Item.objects.order_by('id'), ITEM_COLUMNS, 'updated_at', 'seller_id'),
+}
+
+#a spreadsheet opening the csv runs text starting with these as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def export_rows(name, since=None, until=None, seller=None, chunk_size=CHUNK_SIZE):
+    """
+    The header and a lazy iterator of value tuples for one export. Rows come
+    through ``iterator(chunk_size=...)``, a server-side cursor where the
+    database has one, so only a chunk is ever held in memory.
+    """
+    queryset, columns, timestamp, seller_lookup = EXPORTS[name]
+    queryset = queryset()
+    if since is not None:
+        queryset = queryset.filter(**{f'{timestamp}__gte': since})
+    if until is not None:
+        queryset = queryset.filter(**{f'{timestamp}__lt': until})
+    if seller is not None:
+        queryset = queryset.filter(**{seller_lookup: seller})
+    return list(columns), queryset.values_list(*columns.values()).iterator(chunk_size=chunk_size)
+
+
+def csv_cell(value):
+    if isinstance(value, str):
+        #quoted so it reads as text; only text is touched, a negative price stays a number
+        return f"'{value}" if value.startswith(FORMULA_PREFIXES) else value
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def encode_csv(header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow([csv_cell(value) for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def encode_ndjson(header, rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(dict(zip(header, row))) + '\n'
+
+
+ENCODERS = {
+    'csv': encode_csv,
+    'ndjson': encode_ndjson,
+}
+
+
+def stream_export(name, output='csv', gzip=False, **filters):
+    """
+    Yield the export as byte chunks of roughly ``FLUSH_BYTES``, optionally
+    gzip-compressed on the fly.
+    """
+    header, rows = export_rows(name, **filters)
+    compressor = zlib.compressobj(wbits=31) if gzip else None
+    pending, size = [], 0
+    for text in ENCODERS[output](header, rows):
+        data = text.encode()
+        pending.append(data)
+        size += len(data)
+        if size >= FLUSH_BYTES:
+            chunk = b''.join(pending)
+            pending, size = [], 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+    chunk = b''.join(pending)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def export_filename(name, output, gzip):
+    return f"{name}.{output}{'.gz' if gzip else ''}"
@@ -0,0 +1,189 @@
+"""
+Sparse fieldsets: ``?fields=id,name,price`` renders only those fields and
+``?expand=seller`` swaps a primary key for a nested summary. The view trims
+the query to match, deferring the columns nobody will read and loading
+relations only for fields that are rendered.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+#representations that are the database value unchanged, so the fast path can skip to_representation
+PASSTHROUGH_FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+    serializers.JSONField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+class SparseFieldsMixin:
+    """
+    Serializer side: takes ``fields`` and ``expand`` keyword arguments.
+    ``expandable_fields`` maps an expand name to the field it replaces and a
+    factory for the nested serializer.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in expand:
+            field_name, factory = self.expandable_fields[name]
+            self.fields[field_name] = factory()
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+def parse_list(request, param):
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return [name for name in (part.strip() for part in value.split(',')) if name]
+
+
+def model_column(model, field):
+    """The concrete column a serializer field reads, or None when it is anything more than that."""
+    if isinstance(field, serializers.BaseSerializer) or field.source == '*' or '.' in field.source:
+        return None
+    if isinstance(field, serializers.RelatedField) and type(field) is not serializers.PrimaryKeyRelatedField:
+        return None
+    try:
+        column = model._meta.get_field(field.source)
+    except FieldDoesNotExist:
+        return None
+    if not getattr(column, 'concrete', False) or column.many_to_many:
+        return None
+    return column.name
+
+
+def row_plan(serializer):
+    """
+    ``(name, column, convert)`` for each readable field, or None when some
+    field is not a plain column. ``convert`` is None where the stored value
+    is already the representation.
+    """
+    plan = []
+    for field in serializer._readable_fields:
+        column = model_column(serializer.Meta.model, field)
+        if column is None:
+            return None
+        convert = None if type(field) in PASSTHROUGH_FIELDS else field.to_representation
+        plan.append((field.field_name, column, convert))
+    return plan
+
+
+def render_rows(plan, rows):
+    """
+    What ``serializer(many=True).data`` gives for ``values()`` rows, without
+    building model instances or going through each field's get_attribute.
+    """
+    data = []
+    for row in rows:
+        item = {}
+        for name, column, convert in plan:
+            value = row[column]
+            item[name] = value if value is None or convert is None else convert(value)
+        data.append(item)
+    return data
+
+
+def is_single_valued(model, lookup):
+    for part in lookup.split('__'):
+        field = model._meta.get_field(part)
+        if not (field.many_to_one or field.one_to_one) or not field.concrete:
+            return False
+        model = field.related_model
+    return True
+
+
+class SparseFieldsetMixin:
+    """
+    View side, for viewsets whose serializer uses SparseFieldsMixin. Reads
+    ``?fields=`` and ``?expand=`` on safe methods, rejects unknown names,
+    and shapes the queryset: ``field_prefetches`` are loaded only when their
+    field is rendered, ``expand_lookups`` only when expanded, and unrequested
+    columns are deferred. With ``fast_list`` a flat list is read as
+    ``values()`` and rendered by ``render_rows``.
+    """
+    field_prefetches = {}
+    expand_lookups = {}
+    fast_list = False
+
+    def sparse_params(self):
+        if self.request.method not in SAFE_METHODS:
+            return None, []
+        if not hasattr(self, '_sparse_params'):
+            serializer_class = self.get_serializer_class()
+            fields = parse_list(self.request, 'fields')
+            expand = parse_list(self.request, 'expand') or []
+            known = serializer_class().fields
+            unknown = [name for name in fields or () if name not in known]
+            if unknown:
+                raise ValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}."})
+            unknown = [name for name in expand if name not in serializer_class.expandable_fields]
+            if unknown:
+                raise ValidationError({'expand': f"Unknown expansion(s): {', '.join(unknown)}."})
+            self._sparse_params = fields, expand
+        return self._sparse_params
+
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self.sparse_params()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        if expand:
+            kwargs.setdefault('expand', expand)
+        return super().get_serializer(*args, **kwargs)
+
+    def representation(self, request):
+        return [*super().representation(request), *self.sparse_params()]
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+        fields, expand = self.sparse_params()
+        serializer = self.get_serializer()
+        for name, lookup in self.field_prefetches.items():
+            if name in serializer.fields:
+                queryset = queryset.prefetch_related(lookup)
+        for name in expand:
+            lookup = self.expand_lookups[name]
+            if is_single_valued(queryset.model, lookup):
+                queryset = queryset.select_related(lookup)
+            else:
+                queryset = queryset.prefetch_related(lookup)
+        #columns the page needs whatever is rendered: validators and the cursor position
+        keep = {'pk', queryset.model._meta.pk.name, *self.ordering_columns(queryset)}
+        if any(field.name == 'updated_at' for field in queryset.model._meta.concrete_fields):
+            keep.add('updated_at')
+        plan = row_plan(serializer) if self.fast_list and self.action == 'list' and not expand else None
+        if plan is not None:
+            self._row_plan = plan
+            return queryset.values(*keep, *(column for _, column, _ in plan))
+        if fields is None:
+            return queryset
+        full = self.get_serializer_class()()
+        rendered = {model_column(queryset.model, field) for field in serializer._readable_fields}
+        unused = {model_column(queryset.model, field) for field in full._readable_fields} - rendered - keep - {None}
+        for name in expand:
+            unused.discard(self.expand_lookups[name].split('__')[0])
+        return queryset.defer(*unused) if unused else queryset
+
+    def ordering_columns(self, queryset):
+        get_ordering = getattr(self.paginator, 'get_ordering', None)
+        ordering = get_ordering(self.request, queryset, self) if get_ordering else queryset.query.order_by
+        return [name.lstrip('-') for name in ordering]
+
+    def row_version(self, row):
+        if isinstance(row, dict):
+            return row['pk'], row['updated_at']
+        return super().row_version(row)
+
+    def serialize_list(self, rows):
+        if rows and isinstance(rows[0], dict):
+            return render_rows(self._row_plan, rows)
+        return super().serialize_list(rows)
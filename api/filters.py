@@ -0,0 +1,21 @@
+from rest_framework.filters import BaseFilterBackend
+
+from .serializers import ItemRatingQuerySerializer
+
+
+class ItemRatingFilter(BaseFilterBackend):
+    """
+    Filters items on their denormalized review stats:
+    ``?min_rating=7.5`` and ``?min_reviews=10``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        #empty parameters are ignored, as before
+        params = {name: value for name, value in request.query_params.items() if value and name in ('min_rating', 'min_reviews')}
+        serializer = ItemRatingQuerySerializer(data=params)
+        serializer.is_valid(raise_exception=True)
+        if 'min_rating' in serializer.validated_data:
+            queryset = queryset.filter(rating_average__gte=serializer.validated_data['min_rating'])
+        if 'min_reviews' in serializer.validated_data:
+            queryset = queryset.filter(rating_count__gte=serializer.validated_data['min_reviews'])
+        return queryset
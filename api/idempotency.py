@@ -0,0 +1,131 @@
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+DEFAULTS = {
+    'TTL_SECONDS': 24 * 60 * 60,
+    #how long a duplicate waits for the first request before giving up with 409
+    'WAIT_SECONDS': 10,
+    #lease on an in-progress key; past it the worker is taken for dead and a retry claims the key again
+    'LOCK_SECONDS': 60,
+    'POLL_INTERVAL': 0.05,
+    'MAX_KEY_LENGTH': 255,
+}
+
+HEADER = 'Idempotency-Key'
+REPLAY_HEADER = 'Idempotent-Replayed'
+
+
+def idempotency_settings():
+    return {**DEFAULTS, **getattr(settings, 'IDEMPOTENCY', {})}
+
+
+def request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def claim(user_id, key, fingerprint, config):
+    """
+    Insert the key as in progress. Returns ``(row, created)``: the row this
+    request now owns, or the one another request already holds. An expired
+    row, or one left in progress past its lease, is dropped and claimed afresh.
+    """
+    now = timezone.now()
+    stale = Q(expires_at__lte=now) | Q(status_code__isnull=True, created_at__lte=now - timedelta(seconds=config['LOCK_SECONDS']))
+    rows = IdempotencyKey.objects.filter(user_id=user_id, key=key)
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                row = IdempotencyKey.objects.create(
+                    user_id=user_id, key=key, fingerprint=fingerprint,
+                    expires_at=now + timedelta(seconds=config['TTL_SECONDS']),
+                )
+            return row, True
+        except IntegrityError:
+            #delete only what is stale, so of two retries racing for an abandoned key just one takes it
+            if not rows.filter(stale).delete()[0]:
+                existing = rows.first()
+                if existing is not None:
+                    return existing, False
+    return rows.get(), False
+
+
+def wait_for(row, config):
+    deadline = time.monotonic() + config['WAIT_SECONDS']
+    while row is not None and row.status_code is None and time.monotonic() < deadline:
+        time.sleep(config['POLL_INTERVAL'])
+        row = IdempotencyKey.objects.filter(pk=row.pk).first()
+    return row
+
+
+def replay(row):
+    response = Response(row.response, status=row.status_code)
+    response[REPLAY_HEADER] = 'true'
+    return response
+
+
+def idempotent(handler):
+    """
+    Honour an ``Idempotency-Key`` header on a write action. The first request
+    with a key runs and its response is stored with a TTL. A retry with the
+    same key and body gets that response back without running the action
+    again. A duplicate that arrives while the first is still running waits
+    for it, up to ``WAIT_SECONDS``; one still unanswered after ``LOCK_SECONDS``
+    is taken to have died with its worker and the next retry runs afresh.
+    Server errors are not stored, so the client can retry them. Requests
+    without the header run as before.
+    """
+    @wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return handler(self, request, *args, **kwargs)
+        config = idempotency_settings()
+        if len(key) > config['MAX_KEY_LENGTH']:
+            return Response({'detail': f'{HEADER} is too long'}, status=status.HTTP_400_BAD_REQUEST)
+        fingerprint = request_fingerprint(request)
+        row, created = claim(request.user.pk, key, fingerprint, config)
+        if not created:
+            if row.fingerprint != fingerprint:
+                return Response(
+                    {'detail': f'{HEADER} was already used for a different request'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            row = wait_for(row, config)
+            if row is None:
+                #the first request failed and gave the key up
+                return Response({'detail': 'The original request failed, retry it'}, status=status.HTTP_409_CONFLICT)
+            if row.status_code is None:
+                return Response({'detail': 'A request with this key is still in progress'}, status=status.HTTP_409_CONFLICT)
+            return replay(row)
+        #by pk, a worker that outlived its lease must not touch the row of the request that took over
+        rows = IdempotencyKey.objects.filter(pk=row.pk)
+        try:
+            response = handler(self, request, *args, **kwargs)
+        except Exception:
+            rows.delete()
+            raise
+        if response.status_code >= 500:
+            rows.delete()
+        else:
+            rows.update(status_code=response.status_code, response=response.data)
+        return response
+
+    return wrapper
+
+
+def purge_expired():
+    return IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()[0]
@@ -0,0 +1,240 @@
+import codecs
+import csv
+import json
+import logging
+import os
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .cache import invalidate_all
+from .models import ImportJob, Item
+from .search import chunked, index_items
+from .serializers import ItemSerializer
+
+
+logger = logging.getLogger('api.imports')
+
+DEFAULTS = {
+    'CHUNK_SIZE': 500,
+    'SYNC_MAX_BYTES': 1024 * 1024,
+    'MAX_ERRORS': 1000,
+    'LEASE_SECONDS': 300,
+    'MAX_ATTEMPTS': 3,
+}
+
+CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/json': 'json',
+}
+EXTENSIONS = {
+    '.csv': 'csv',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+    '.json': 'json',
+}
+
+UPDATE_FIELDS = ['name', 'description', 'price']
+
+
+def import_settings():
+    return {**DEFAULTS, **getattr(settings, 'ITEM_IMPORT', {})}
+
+
+def import_source(request):
+    """
+    The uploaded file and its format: a multipart ``file`` named ``.csv``,
+    ``.ndjson`` or ``.json``, or a raw body sent as CSV, NDJSON or a JSON array.
+    """
+    content_type = request.content_type.split(';')[0].strip().lower()
+    if content_type == 'multipart/form-data':
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValueError('Upload the rows in a "file" field.')
+        fmt = EXTENSIONS.get(os.path.splitext(upload.name)[1].lower())
+    else:
+        fmt = CONTENT_TYPES.get(content_type)
+        upload = ContentFile(request.body, name=f'items.{fmt}')
+    if fmt is None:
+        raise ValueError('Send CSV, NDJSON or a JSON array of items.')
+    return upload, fmt
+
+
+def read_rows(fh, fmt):
+    """
+    Yield one mapping per input row. Lines that fail to parse are yielded as
+    the exception so they are reported against their row number.
+    """
+    if fmt == 'csv':
+        yield from csv.DictReader(codecs.iterdecode(fh, 'utf-8-sig'))
+    elif fmt == 'ndjson':
+        for line in fh:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as exc:
+                yield exc
+    else:
+        #a json array is parsed whole, large files should come as csv or ndjson
+        rows = json.load(fh)
+        if not isinstance(rows, list):
+            raise ValueError('Expected a JSON array of items.')
+        yield from rows
+
+
+def write_chunk(seller_id, rows):
+    #rows carrying a sku the seller already has update that item, everything else is created
+    skus = [row['sku'] for row in rows if row.get('sku')]
+    existing = dict(Item.objects.filter(seller_id=seller_id, sku__in=skus).values_list('sku', 'pk'))
+    now = timezone.now()
+    new, changed = [], []
+    for row in rows:
+        pk = existing.get(row.get('sku'))
+        if pk is None:
+            new.append(Item(seller_id=seller_id, **row))
+        else:
+            changed.append(Item(pk=pk, seller_id=seller_id, updated_at=now, **row))
+    Item.objects.bulk_create(new)
+    Item.objects.bulk_update(changed, [*UPDATE_FIELDS, 'updated_at'])
+    #bulk writes fire no signals, so keep search in step here
+    index_items(new + changed)
+    return len(new), len(changed)
+
+
+def write_rows(seller_id, rows, errors):
+    created = updated = 0
+    errors = list(errors)
+    for number, data in rows:
+        try:
+            with transaction.atomic():
+                new, changed = write_chunk(seller_id, [data])
+        except IntegrityError:
+            errors.append({'row': number, 'errors': {'sku': ['An item with this sku already exists.']}})
+            continue
+        created += new
+        updated += changed
+    errors.sort(key=lambda error: error['row'])
+    return created, updated, errors
+
+
+def import_items(seller_id, rows, start=0, on_chunk=None):
+    """
+    Validate ``rows`` with the ``ItemSerializer`` rules and write them in
+    chunks of ``CHUNK_SIZE``, each chunk in its own transaction. ``start``
+    skips rows a previous run already committed; ``on_chunk(rows_done,
+    created, updated, errors)`` runs inside each chunk's transaction so
+    progress is recorded atomically with the rows. Returns the totals and
+    up to ``MAX_ERRORS`` per-row errors.
+    """
+    config = import_settings()
+    serializer = ItemSerializer()
+    report = {'created': 0, 'updated': 0, 'error_count': 0, 'errors': []}
+    for batch in chunked(islice(enumerate(rows, start=1), start, None), config['CHUNK_SIZE']):
+        valid, errors = {}, []
+        for number, row in batch:
+            try:
+                if isinstance(row, Exception):
+                    raise ValidationError({'non_field_errors': [f'Could not parse row: {row}']})
+                data = serializer.run_validation(row)
+            except ValidationError as exc:
+                errors.append({'row': number, 'errors': exc.detail})
+                continue
+            #a sku repeated within a chunk is written once, the last row wins
+            valid[data.get('sku') or ('row', number)] = number, data
+        try:
+            with transaction.atomic():
+                created, updated = write_chunk(seller_id, [data for _, data in valid.values()])
+                if on_chunk is not None:
+                    on_chunk(batch[-1][0], created, updated, errors)
+        except IntegrityError:
+            #a concurrent writer took one of the skus first: redo the chunk a row at a time, so a
+            #row whose sku was since created is updated and one that still clashes becomes a row error
+            with transaction.atomic():
+                created, updated, errors = write_rows(seller_id, valid.values(), errors)
+                if on_chunk is not None:
+                    on_chunk(batch[-1][0], created, updated, errors)
+        invalidate_all('item')
+        report['created'] += created
+        report['updated'] += updated
+        report['error_count'] += len(errors)
+        report['errors'] += errors[:config['MAX_ERRORS'] - len(report['errors'])]
+    return report
+
+
+def finish(job, status, error=None):
+    """Close ``job`` and delete its upload, nothing reads it again."""
+    if error is not None:
+        job.errors = [*job.errors, {'row': None, 'errors': {'non_field_errors': [error]}}][:import_settings()['MAX_ERRORS']]
+    job.status = status
+    job.lease_until = None
+    job.finished_at = timezone.now()
+    job.file.delete(save=False)
+    job.save(update_fields=['status', 'errors', 'lease_until', 'finished_at', 'file'])
+
+
+def claim_job():
+    """
+    Lease the oldest pending job, or a running one whose worker stopped
+    renewing its lease, to the calling worker. A job already started
+    ``MAX_ATTEMPTS`` times is failed instead of being run again.
+    """
+    config = import_settings()
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            job = (
+                ImportJob.objects
+                .select_for_update(skip_locked=True)
+                .filter(Q(status=ImportJob.PENDING) | Q(status=ImportJob.RUNNING, lease_until__lte=now))
+                .order_by('created_at')
+                .first()
+            )
+            if job is None:
+                return None
+            if job.attempts < config['MAX_ATTEMPTS']:
+                job.status = ImportJob.RUNNING
+                job.attempts += 1
+                job.lease_until = now + timedelta(seconds=config['LEASE_SECONDS'])
+                job.save(update_fields=['status', 'attempts', 'lease_until'])
+                return job
+            finish(job, ImportJob.FAILED, f'Gave up after {job.attempts} attempts.')
+
+
+def run_job(job):
+    config = import_settings()
+
+    def progress(rows_done, created, updated, errors):
+        job.rows_done = rows_done
+        job.created_count += created
+        job.updated_count += updated
+        job.error_count += len(errors)
+        job.errors = (job.errors + errors)[:config['MAX_ERRORS']]
+        job.lease_until = timezone.now() + timedelta(seconds=config['LEASE_SECONDS'])
+        job.save(update_fields=['rows_done', 'created_count', 'updated_count', 'error_count', 'errors', 'lease_until'])
+
+    try:
+        with job.file.open('rb') as fh:
+            import_items(job.seller_id, read_rows(fh, job.format), start=job.rows_done, on_chunk=progress)
+    except ValueError as exc:
+        #the file itself is bad, another run would fail the same way
+        finish(job, ImportJob.FAILED, str(exc))
+    except Exception:
+        logger.exception('import %s failed on attempt %s', job.pk, job.attempts)
+        if job.attempts >= config['MAX_ATTEMPTS']:
+            finish(job, ImportJob.FAILED, f'Gave up after {job.attempts} attempts.')
+        else:
+            #queued again, the next run resumes after the rows already committed
+            job.status = ImportJob.PENDING
+            job.lease_until = None
+            job.save(update_fields=['status', 'lease_until'])
+    else:
+        finish(job, ImportJob.DONE)
+    return job
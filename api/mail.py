@@ -0,0 +1,82 @@
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+
+DEFAULTS = {
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_SECONDS': 30,
+    'MAX_BACKOFF_SECONDS': 3600,
+    'LEASE_SECONDS': 300,
+}
+
+
+def queue_settings():
+    return {**DEFAULTS, **getattr(settings, 'EMAIL_QUEUE', {})}
+
+
+def queue_email(to, subject, body):
+    #one insert on the request path, delivery happens in the send_queued_emails worker
+    return OutboundEmail.objects.create(to=to, subject=subject, body=body)
+
+
+def claim_batch(size):
+    """
+    Lease up to ``size`` due messages to the calling worker. A leased message
+    whose worker died becomes due again once the lease runs out.
+    """
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=queue_settings()['LEASE_SECONDS'])
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(status=OutboundEmail.PENDING) | Q(status=OutboundEmail.SENDING), next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:size]
+        )
+        OutboundEmail.objects.filter(pk__in=[message.pk for message in batch]).update(
+            status=OutboundEmail.SENDING, next_attempt_at=lease_until,
+        )
+    return batch
+
+
+def backoff(attempts):
+    config = queue_settings()
+    delay = min(config['BACKOFF_SECONDS'] * 2 ** (attempts - 1), config['MAX_BACKOFF_SECONDS'])
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def send_batch(messages, connection):
+    sent, failed = [], []
+    for message in messages:
+        email = EmailMessage(message.subject, message.body, settings.DEFAULT_FROM_EMAIL, [message.to], connection=connection)
+        try:
+            email.send()
+        except Exception as exc:
+            failed.append((message, repr(exc)))
+        else:
+            sent.append(message.pk)
+    return sent, failed
+
+
+def record_results(sent, failed):
+    now = timezone.now()
+    max_attempts = queue_settings()['MAX_ATTEMPTS']
+    with transaction.atomic():
+        OutboundEmail.objects.filter(pk__in=sent).update(status=OutboundEmail.SENT, sent_at=now, last_error='')
+        for message, error in failed:
+            message.attempts += 1
+            message.last_error = error
+            if message.attempts >= max_attempts:
+                message.status = OutboundEmail.DEAD
+            else:
+                message.status = OutboundEmail.PENDING
+                message.next_attempt_at = now + backoff(message.attempts)
+            message.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
@@ -0,0 +1,123 @@
+import json
+import platform
+import random
+import statistics
+import time
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment
+from rest_framework.test import APIClient
+
+from api.authentication import ClaimsTokenObtainPairSerializer
+from api.models import Item
+from api.seeding import NOUNS, seed_dataset
+
+
+SCENARIOS = ['browse', 'item_detail', 'search', 'add_to_cart', 'checkout', 'review']
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway database and drive the real api routes (browse, search, add to cart, '
+        'checkout, review) through the test client, reporting latency percentiles and queries per request.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario.')
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='Run only these scenarios.')
+        parser.add_argument('--output', help='Write the results as JSON to this path.')
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        #every simulated client shares one address, so throttling would only measure 429s
+        throttling = override_settings(THROTTLING={'ENABLED': False})
+        throttling.enable()
+        try:
+            customers, _ = seed_dataset(scale=options['scale'], seed=options['seed'])
+            self.rng = random.Random(options['seed'])
+            self.item_ids = list(Item.objects.values_list('pk', flat=True))
+            self.clients = [self.client_for(customer) for customer in self.rng.sample(customers, min(50, len(customers)))]
+            results = {}
+            for scenario in options['scenario'] or SCENARIOS:
+                results[scenario] = self.run(scenario, options['requests'])
+                row = results[scenario]
+                self.stdout.write(
+                    f"{scenario:12} p50 {row['p50_ms']:8.2f} ms  p95 {row['p95_ms']:8.2f} ms  "
+                    f"p99 {row['p99_ms']:8.2f} ms  {row['queries_per_request']:5.1f} queries  {row['errors']} errors"
+                )
+        finally:
+            throttling.disable()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump({
+                    'started_at': datetime.now(timezone.utc).isoformat(),
+                    'python': platform.python_version(),
+                    'vendor': connection.vendor,
+                    'options': {key: options[key] for key in ('scale', 'seed', 'requests', 'scenario')},
+                    'results': results,
+                }, fh, indent=2)
+
+    def client_for(self, user):
+        client = APIClient()
+        token = ClaimsTokenObtainPairSerializer.get_token(user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client
+
+    def run(self, scenario, requests):
+        step = getattr(self, f'step_{scenario}')
+        latencies, queries, errors = [], [], 0
+        for _ in range(requests):
+            client = self.rng.choice(self.clients)
+            request = step(client)
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = request()
+                latencies.append((time.perf_counter() - start) * 1000)
+            queries.append(len(ctx.captured_queries))
+            errors += response.status_code >= 400
+        latencies.sort()
+        pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+        return {
+            'requests': requests,
+            'p50_ms': pick(0.50),
+            'p95_ms': pick(0.95),
+            'p99_ms': pick(0.99),
+            'mean_ms': statistics.fmean(latencies),
+            'queries_per_request': statistics.fmean(queries),
+            'max_queries': max(queries),
+            'errors': errors,
+        }
+
+    #each step does its setup and returns the request to be measured
+    def step_browse(self, client):
+        ordering = self.rng.choice(['', '-rating_average', 'price'])
+        return lambda: client.get('/api/items/', {'ordering': ordering} if ordering else {})
+
+    def step_item_detail(self, client):
+        item_id = self.rng.choice(self.item_ids)
+        return lambda: client.get(f'/api/items/{item_id}/')
+
+    def step_search(self, client):
+        term = self.rng.choice(NOUNS)[:self.rng.randint(3, 6)]
+        return lambda: client.get('/api/items/', {'search': term})
+
+    def step_add_to_cart(self, client):
+        item_id = self.rng.choice(self.item_ids)
+        return lambda: client.post('/api/carts/add/', {'item_id': item_id, 'quantity': 1}, format='json')
+
+    def step_checkout(self, client):
+        for item_id in self.rng.sample(self.item_ids, 3):
+            client.post('/api/carts/add/', {'item_id': item_id, 'quantity': 1}, format='json')
+        return lambda: client.post('/api/carts/create-order/')
+
+    def step_review(self, client):
+        payload = {'item': self.rng.choice(self.item_ids), 'rating': self.rng.randint(1, 10), 'comment': 'benchmark'}
+        return lambda: client.post('/api/reviews/', payload, format='json')
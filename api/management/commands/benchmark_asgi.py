@@ -0,0 +1,85 @@
+import asyncio
+import json
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from api.models import User, Item, Review
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the ASGI application in-process with many concurrent readers and compare the '
+        'sync DRF catalog/review endpoints with their async counterparts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=5000)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=200)
+        parser.add_argument('--output', help='Write the results as JSON to this path.')
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            item_pk = self.seed(options['items'])
+            scenarios = [
+                ('items list', '/api/items/', '/api/async/items/'),
+                ('item detail', f'/api/items/{item_pk}/', f'/api/async/items/{item_pk}/'),
+                ('reviews list', '/api/reviews/', '/api/async/reviews/'),
+            ]
+            results = []
+            # the response cache would hide the view cost on the sync side, and
+            # throttling would turn a single-address load test into 429s
+            with override_settings(CATALOG_CACHE={'ENABLED': False}, THROTTLING={'ENABLED': False}):
+                for name, sync_path, async_path in scenarios:
+                    for mode, path in (('sync', sync_path), ('async', async_path)):
+                        result = asyncio.run(self.load(path, options['requests'], options['concurrency']))
+                        results.append({'scenario': name, 'mode': mode, 'path': path, **result})
+                        self.stdout.write(
+                            f"{name:14} {mode:5} {result['rps']:9.1f} req/s  "
+                            f"p50 {result['p50_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms"
+                        )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump({'options': options, 'results': results}, fh, indent=2)
+
+    def seed(self, count):
+        seller = User.objects.create_user(username='seller', email='seller@example.com', password='!', is_seller=True)
+        customer = User.objects.create_user(username='customer', email='customer@example.com', password='!')
+        items = Item.objects.bulk_create([
+            Item(name=f'item {i}', description='benchmark item ' * 10, price=Decimal('9.99'), seller=seller)
+            for i in range(count)
+        ], batch_size=2000)
+        Review.objects.bulk_create([
+            Review(user=customer, item=item, rating=i % 10 + 1, comment='fine') for i, item in enumerate(items)
+        ], batch_size=2000)
+        return items[len(items) // 2].pk
+
+    async def load(self, path, requests, concurrency):
+        client = AsyncClient()
+        gate = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one():
+            async with gate:
+                start = time.perf_counter()
+                response = await client.get(path)
+                latencies.append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 200, (path, response.status_code)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+        return {'rps': requests / elapsed, 'p50_ms': pick(0.50), 'p95_ms': pick(0.95), 'p99_ms': pick(0.99)}
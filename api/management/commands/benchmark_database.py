@@ -0,0 +1,150 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from rest_framework.test import APIClient
+
+from api.models import Item
+from api.seeding import seed_dataset
+
+
+SQLITE_PRESETS = {
+    'sqlite-default': {'DATABASE_SQLITE_WAL': '0', 'DATABASE_CONN_MAX_AGE': '0'},
+    'sqlite-wal': {'DATABASE_SQLITE_WAL': '1', 'DATABASE_CONN_MAX_AGE': '60'},
+}
+POSTGRES_PRESETS = {
+    'postgres-per-request': {'DATABASE_CONN_MAX_AGE': '0', 'DATABASE_POOL_MAX_SIZE': '0'},
+    'postgres-persistent': {'DATABASE_CONN_MAX_AGE': '60', 'DATABASE_POOL_MAX_SIZE': '0'},
+    'postgres-pool': {'DATABASE_POOL_MAX_SIZE': '{writers}'},
+}
+
+
+@contextmanager
+def scratch_database():
+    """
+    A throwaway test database for concurrent benchmarks, with throttling off.
+    SQLite gets a file rather than the in-memory default, which would hide
+    journaling and file locking.
+    """
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict['TEST']
+    old_test_name = test_settings['NAME']
+    scratch = tempfile.TemporaryDirectory()
+    if connection.vendor == 'sqlite':
+        test_settings['NAME'] = os.path.join(scratch.name, 'benchmark.sqlite3')
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        with override_settings(THROTTLING={'ENABLED': False}):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        test_settings['NAME'] = old_test_name
+        scratch.cleanup()
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure requests per second with concurrent writers (cart adds and checkouts) against the database '
+        'configured from the environment, or with --compare against each preset of that backend.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help='Concurrent customers.')
+        parser.add_argument('--rounds', type=int, default=30, help='Add-add-checkout rounds per writer.')
+        parser.add_argument('--scale', type=float, default=0.05, help='Seed scale, see seed_data.')
+        parser.add_argument('--compare', action='store_true', help='Run once per preset in a fresh process.')
+        parser.add_argument('--output', help='Write the results as JSON to this path.')
+
+    def handle(self, *args, **options):
+        results = self.compare(options) if options['compare'] else [self.run(options)]
+        for row in results:
+            self.stdout.write(
+                f"{row['label']:22} {row['rps']:8.1f} req/s  p50 {row['p50_ms']:8.2f} ms  "
+                f"p99 {row['p99_ms']:8.2f} ms  {row['errors']} errors"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+
+    def compare(self, options):
+        presets = POSTGRES_PRESETS if connection.vendor == 'postgresql' else SQLITE_PRESETS
+        results = []
+        for label, overrides in presets.items():
+            with tempfile.NamedTemporaryFile(suffix='.json') as out:
+                env = {**os.environ, **{key: value.format(**options) for key, value in overrides.items()}}
+                command = [
+                    sys.executable, '-m', 'django', 'benchmark_database', '--output', out.name,
+                    '--writers', str(options['writers']), '--rounds', str(options['rounds']), '--scale', str(options['scale']),
+                ]
+                completed = subprocess.run(command, env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+                if completed.returncode:
+                    raise CommandError(f'{label} failed:\n{completed.stderr}')
+                row = json.load(out)[0]
+            results.append({**row, 'label': label})
+        return results
+
+    def run(self, options):
+        with scratch_database():
+            customers, _ = seed_dataset(scale=options['scale'], cart_lines=0)
+            item_ids = list(Item.objects.values_list('pk', flat=True))
+            #release the seeding connection so the writer threads start on equal terms
+            connection.close()
+            return self.load(customers[:options['writers']], item_ids, options['rounds'])
+
+    def load(self, customers, item_ids, rounds):
+        latencies, errors, lock = [], [0], threading.Lock()
+
+        def write(customer):
+            client = APIClient(raise_request_exception=False)
+            client.force_authenticate(customer)
+            rng = random.Random(customer.pk)
+            try:
+                for _ in range(rounds):
+                    for path, data in (
+                        ('/api/carts/add/', {'item_id': rng.choice(item_ids)}),
+                        ('/api/carts/add/', {'item_id': rng.choice(item_ids)}),
+                        ('/api/carts/create-order/', {}),
+                    ):
+                        start = time.perf_counter()
+                        response = client.post(path, data, format='json')
+                        elapsed = (time.perf_counter() - start) * 1000
+                        with lock:
+                            latencies.append(elapsed)
+                            errors[0] += response.status_code >= 500
+            finally:
+                #connection is per thread, close this worker's own
+                connection.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(customers)) as pool:
+            list(pool.map(write, customers))
+        duration = time.perf_counter() - start
+        latencies.sort()
+        pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+        db = connection.settings_dict
+        return {
+            'label': connection.vendor,
+            'settings': {
+                'conn_max_age': db['CONN_MAX_AGE'],
+                'options': {key: value for key, value in db['OPTIONS'].items() if key != 'password'},
+            },
+            'writers': len(customers),
+            'requests': len(latencies),
+            'rps': len(latencies) / duration,
+            'p50_ms': pick(0.50),
+            'p99_ms': pick(0.99),
+            'errors': errors[0],
+        }
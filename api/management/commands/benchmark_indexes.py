@@ -0,0 +1,99 @@
+import json
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.models import User, Order, SupportRequest
+
+
+INDEXED_MODELS = [User, Order, SupportRequest]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway database, then time the hot lookups of the api views and record '
+        'their query plans with the Meta.indexes of the models dropped and recreated.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50000)
+        parser.add_argument('--orders-per-user', type=int, default=4)
+        parser.add_argument('--support-requests', type=int, default=50000)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--output', help='Write the results as JSON to this path.')
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            probes = self.seed(options)
+            results = {}
+            self.set_indexes(False)
+            results['before'] = self.measure(probes, options['repeat'])
+            self.set_indexes(True)
+            results['after'] = self.measure(probes, options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        for name in results['after']:
+            before, after = results['before'][name], results['after'][name]
+            self.stdout.write(f"{name:32} {before['median_ms']:9.3f} ms -> {after['median_ms']:9.3f} ms")
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump({'vendor': connection.vendor, 'options': options, 'results': results}, fh, indent=2, default=str)
+
+    def seed(self, options):
+        users = User.objects.bulk_create([
+            User(
+                username=f'user{i}',
+                email=f'user{i}@example.com',
+                password='!',
+                is_verified=i % 10 != 0,
+                verification_code=None if i % 10 else f'{i % 1000000:06d}',
+            )
+            for i in range(options['users'])
+        ], batch_size=2000)
+        Order.objects.bulk_create(
+            (Order(customer=user) for user in users for _ in range(options['orders_per_user'])),
+            batch_size=2000,
+        )
+        SupportRequest.objects.bulk_create([
+            SupportRequest(user=users[i % len(users)], email='help@example.com', subject='help', message='', resolved=i % 20 != 0)
+            for i in range(options['support_requests'])
+        ], batch_size=2000)
+        pending = User.objects.filter(is_verified=False).values_list('verification_code', flat=True).first()
+        customer = random.choice(users)
+        return {
+            'orders_by_customer': lambda: Order.objects.filter(customer=customer).order_by('-created_at')[:20],
+            'user_by_email': lambda: User.objects.filter(email=customer.email),
+            'user_by_pending_code': lambda: User.objects.filter(verification_code=pending, is_verified=False),
+            'unresolved_support_requests': lambda: SupportRequest.objects.filter(resolved=False).order_by('created_at')[:50],
+        }
+
+    def set_indexes(self, enabled):
+        with connection.schema_editor() as editor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    if enabled:
+                        editor.add_index(model, index)
+                    else:
+                        editor.remove_index(model, index)
+
+    def measure(self, probes, repeat):
+        results = {}
+        for name, probe in probes.items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(probe())
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            results[name] = {
+                'median_ms': statistics.median(timings),
+                'p95_ms': timings[int(len(timings) * 0.95) - 1],
+                'plan': probe().explain(),
+            }
+        return results
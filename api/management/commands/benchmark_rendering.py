@@ -0,0 +1,90 @@
+import gzip
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.middleware import brotli, compression_settings
+from api.models import Order
+from api.renderers import CODECS, orjson
+from api.seeding import seed_dataset
+
+
+ENDPOINTS = {
+    'items': '/api/items/?page_size=200',
+    'items sparse': '/api/items/?page_size=200&fields=id,name,price',
+    'item': '/api/items/{item}/',
+    'orders': '/api/orders/?page_size=20',
+    'reviews': '/api/reviews/?page_size=200',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the payload of each main endpoint with DRF's JSONRenderer and each available codec, "
+        'reporting render time and the bytes sent raw, gzipped and brotli-compressed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=0.2, help='Seed scale, see seed_data.')
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--output', help='Write the results as JSON to this path.')
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(THROTTLING={'ENABLED': False}, CATALOG_CACHE={'ENABLED': False}):
+                seed_dataset(scale=options['scale'])
+                payloads = self.payloads()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        renderers = {'drf': lambda data: JSONRenderer().render(data)}
+        for name, codec_class in CODECS.items():
+            if name != 'orjson' or orjson is not None:
+                renderers[name] = codec_class().dumps
+        config = compression_settings()
+        results = []
+        for endpoint, data in payloads.items():
+            body = renderers['drf'](data)
+            row = {
+                'endpoint': endpoint,
+                'render_ms': {name: self.best(render, data, options['repeat']) for name, render in renderers.items()},
+                'bytes': len(body),
+                'gzip_bytes': len(gzip.compress(body, compresslevel=config['GZIP_LEVEL'])),
+                'br_bytes': len(brotli.compress(body, quality=config['BROTLI_QUALITY'])) if brotli else None,
+            }
+            results.append(row)
+            timings = '  '.join(f'{name} {ms:6.3f} ms' for name, ms in row['render_ms'].items())
+            br = f"br {row['br_bytes']:7}" if brotli else 'br n/a'
+            self.stdout.write(
+                f"{endpoint:13} {timings}  raw {row['bytes']:7}  gzip {row['gzip_bytes']:7}  {br}"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+
+    def payloads(self):
+        order = Order.objects.order_by('-item_count').select_related('customer').first()
+        client = APIClient()
+        client.force_authenticate(order.customer)
+        item = order.order_items.values_list('item_id', flat=True).first()
+        payloads = {}
+        for endpoint, path in ENDPOINTS.items():
+            response = client.get(path.format(item=item))
+            payloads[endpoint] = response.data
+        return payloads
+
+    def best(self, render, data, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            render(data)
+            timings.append((time.perf_counter() - start) * 1000)
+        return min(timings)
@@ -0,0 +1,75 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from api.fieldsets import render_rows, row_plan
+from api.models import Item
+from api.seeding import seed_dataset
+from api.serializers import ItemSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Time rendering a page of items with the stock ModelSerializer against the values() fast path '
+        'used by read-only lists, for the full representation and for a ?fields= subset.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=0.2, help='Seed scale, see seed_data.')
+        parser.add_argument('--rows', type=int, default=200, help='Rows per page.')
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--output', help='Write the results as JSON to this path.')
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            seed_dataset(scale=options['scale'], cart_lines=0)
+            results = [
+                self.compare('full', None, options),
+                self.compare('id,name,price', ['id', 'name', 'price'], options),
+            ]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        for row in results:
+            self.stdout.write(
+                f"{row['fields']:14} serializer {row['serializer_ms']:8.2f} ms  fast {row['fast_ms']:8.2f} ms  "
+                f"{row['speedup']:5.1f}x  {'same output' if row['identical'] else 'OUTPUT DIFFERS'}"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+
+    def compare(self, label, fields, options):
+        #a fresh queryset per run, an evaluated one would serve its cached rows
+        page = lambda: Item.objects.order_by('-id')[:options['rows']]
+
+        def stock():
+            return ItemSerializer(list(page()), many=True, fields=fields).data
+
+        def fast():
+            plan = row_plan(ItemSerializer(fields=fields))
+            return render_rows(plan, list(page().values(*{column for _, column, _ in plan})))
+
+        serializer_ms, fast_ms = self.best(stock, options['repeat']), self.best(fast, options['repeat'])
+        return {
+            'fields': label,
+            'rows': options['rows'],
+            'serializer_ms': serializer_ms,
+            'fast_ms': fast_ms,
+            'speedup': serializer_ms / fast_ms,
+            'identical': json.dumps(stock()) == json.dumps(fast()),
+        }
+
+    def best(self, render, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            render()
+            timings.append((time.perf_counter() - start) * 1000)
+        return min(timings)
@@ -0,0 +1,100 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Sum
+from rest_framework.test import APIClient
+
+from api.management.commands.benchmark_database import scratch_database
+from api.models import Cart, CartItem, Item, OrderItem, StockReservation, User
+from api.stock import set_stock, stock_level
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure checkout throughput when every customer buys the same item, once with a single stock '
+        'counter and once per --shards value, and check that no unit was oversold.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help='Concurrent customers.')
+        parser.add_argument('--rounds', type=int, default=25, help='Checkouts per customer.')
+        parser.add_argument('--stock', type=int, help='Units on hand, defaults to what the checkouts need.')
+        parser.add_argument('--shards', type=int, action='append', help='Shard counts to compare, default 8.')
+        parser.add_argument('--output', help='Write the results as JSON to this path.')
+
+    def handle(self, *args, **options):
+        results = []
+        with scratch_database():
+            seller = User.objects.create_user(username='bench-seller', email='seller@example.com', is_seller=True)
+            customers = [
+                User.objects.create_user(username=f'bench-customer{i}', email=f'customer{i}@example.com')
+                for i in range(options['writers'])
+            ]
+            Cart.objects.bulk_create([Cart(user=customer) for customer in customers])
+            stock = options['stock'] if options['stock'] is not None else options['writers'] * options['rounds']
+            for shards in [0, *(options['shards'] or [8])]:
+                item = Item.objects.create(name='flash sale', description='', price=Decimal('9.99'), seller=seller)
+                set_stock(item, stock, shards)
+                #release the setup connection so the writer threads start on equal terms
+                connection.close()
+                row = self.load(customers, item, options['rounds'])
+                sold = OrderItem.objects.filter(item=item).aggregate(units=Sum('quantity'))['units'] or 0
+                left = stock_level(Item.objects.get(pk=item.pk))
+                held = StockReservation.objects.filter(item=item).aggregate(units=Sum('quantity'))['units'] or 0
+                results.append({
+                    **row,
+                    'label': f'{shards} shards' if shards else 'single row',
+                    'sold': sold,
+                    'left': left,
+                    'consistent': sold + left + held == stock,
+                })
+                CartItem.objects.all().delete()
+        for row in results:
+            self.stdout.write(
+                f"{row['label']:12} {row['checkouts_per_s']:8.1f} checkouts/s  p50 {row['p50_ms']:8.2f} ms  "
+                f"p99 {row['p99_ms']:8.2f} ms  {row['sold']} sold  {row['sold_out']} sold out  "
+                f"{row['errors']} errors  {'consistent' if row['consistent'] else 'STOCK MISMATCH'}"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+
+    def load(self, customers, item, rounds):
+        latencies, counts, lock = [], {'ok': 0, 'sold_out': 0, 'errors': 0}, threading.Lock()
+
+        def buy(customer):
+            client = APIClient(raise_request_exception=False)
+            client.force_authenticate(customer)
+            try:
+                for _ in range(rounds):
+                    client.post('/api/carts/add/', {'item_id': item.pk}, format='json')
+                    start = time.perf_counter()
+                    response = client.post('/api/carts/create-order/', {}, format='json')
+                    elapsed = (time.perf_counter() - start) * 1000
+                    outcome = 'ok' if response.status_code == 201 else 'sold_out' if response.status_code == 409 else 'errors'
+                    with lock:
+                        latencies.append(elapsed)
+                        counts[outcome] += 1
+            finally:
+                #connection is per thread, close this worker's own
+                connection.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(customers)) as pool:
+            list(pool.map(buy, customers))
+        duration = time.perf_counter() - start
+        latencies.sort()
+        pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+        return {
+            'writers': len(customers),
+            'checkouts': len(latencies),
+            'checkouts_per_s': counts['ok'] / duration,
+            'p50_ms': pick(0.50),
+            'p99_ms': pick(0.99),
+            **counts,
+        }
@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.exports import CHUNK_SIZE, EXPORTS, stream_export
+from api.serializers import ExportQuerySerializer
+
+
+class Command(BaseCommand):
+    help = 'Stream a CSV or NDJSON dump of orders or items to a file or stdout without loading it into memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(EXPORTS))
+        parser.add_argument('--output', default='csv', help='csv or ndjson.')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--since', help='Only rows at or after this date/time (order date, item last change).')
+        parser.add_argument('--until', help='Only rows before this date/time.')
+        parser.add_argument('--seller', type=int, help='Only rows for this seller id.')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--file', help='Write here instead of stdout.')
+
+    def handle(self, *args, **options):
+        params = {key: options[key] for key in ('output', 'gzip', 'since', 'until', 'seller') if options[key] is not None}
+        serializer = ExportQuerySerializer(data=params)
+        if not serializer.is_valid():
+            raise CommandError(serializer.errors)
+        filters = dict(serializer.validated_data)
+        output, gzip = filters.pop('output'), filters.pop('gzip')
+        chunks = stream_export(options['name'], output, gzip, chunk_size=options['chunk_size'], **filters)
+        if options['file'] is None:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+        written = 0
+        with open(options['file'], 'wb') as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+                written += len(chunk)
+        self.stderr.write(f"Wrote {written} bytes to {options['file']}.")
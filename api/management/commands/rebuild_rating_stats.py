@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import invalidate_all
+from api.models import Item, Review
+from api.ratings import rebuild_rating_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized review stats of every item from its reviews.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        updated = rebuild_rating_stats(Item, Review, chunk_size=options['chunk_size'])
+        invalidate_all('item')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating stats for {updated} items.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.analytics import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the seller sales rollups (day, week, month) from the full order history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        lines = rebuild_rollups(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {lines} order lines.'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from api.models import Item
+from api.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for items from scratch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        if backend is None:
+            self.stdout.write(f'No full-text backend for {connection.vendor}, nothing to do.')
+            return
+        items = Item.objects.only('name', 'description').order_by('pk').iterator(chunk_size=options['chunk_size'])
+        with transaction.atomic(), connection.cursor() as cursor:
+            backend.clear(cursor)
+            backend.index(cursor, ((item.pk, item.name, item.description) for item in items))
+        self.stdout.write(self.style.SUCCESS(f'Indexed {Item.objects.count()} items.'))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.stock import release_expired
+
+
+class Command(BaseCommand):
+    help = 'Return the units held by expired stock reservations, e.g. from checkouts whose worker died.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Reservations released per transaction.')
+        parser.add_argument('--sleep', type=float, default=30.0, help='Seconds between passes.')
+        parser.add_argument('--once', action='store_true', help='Run one pass and exit.')
+
+    def handle(self, *args, **options):
+        while True:
+            released = release_expired(options['batch_size'])
+            if released:
+                self.stdout.write(f'released {released} expired reservations')
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
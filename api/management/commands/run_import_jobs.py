@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.imports import claim_job, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run queued bulk item imports, resuming jobs whose worker stopped partway through.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sleep', type=float, default=5.0, help='Seconds to wait when no job is due.')
+        parser.add_argument('--once', action='store_true', help='Run the due jobs and exit.')
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+            if job.rows_done:
+                self.stdout.write(f'resuming import {job.pk} after row {job.rows_done}')
+            job = run_job(job)
+            self.stdout.write(
+                f'import {job.pk} {job.status}: {job.created_count} created, {job.updated_count} updated, '
+                f'{job.error_count} errors'
+            )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from api.seeding import SCALE, seed_dataset
+
+
+class Command(BaseCommand):
+    help = 'Bulk-insert a realistic dataset of users, sellers, items, carts, orders, reviews and favorites.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0, help='Multiplies the number of customers and sellers.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--password', default='password', help='Password given to every seeded user.')
+        for name in SCALE:
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, dest=name, help=f'Default {SCALE[name]}.')
+
+    def handle(self, *args, **options):
+        counts = {name: options[name] for name in SCALE if options[name] is not None}
+        customers, sellers = seed_dataset(
+            scale=options['scale'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            password=options['password'],
+            **counts,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Seeded {len(customers)} customers and {len(sellers)} sellers.'))
@@ -0,0 +1,60 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from api.mail import claim_batch, send_batch, record_results
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbound emails with a pool of mail connections, retrying failures with backoff.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Number of mail connections kept open.')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Drain the due messages and exit.')
+
+    def handle(self, *args, **options):
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+        workers = options['workers']
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                while True:
+                    batch = claim_batch(options['batch_size'])
+                    if not batch:
+                        if options['once']:
+                            break
+                        time.sleep(options['sleep'])
+                        continue
+                    chunks = [batch[i::workers] for i in range(workers) if batch[i::workers]]
+                    sent, failed = [], []
+                    for chunk_sent, chunk_failed in pool.map(self.deliver, chunks):
+                        sent += chunk_sent
+                        failed += chunk_failed
+                    record_results(sent, failed)
+                    self.stdout.write(f'sent {len(sent)}, failed {len(failed)}')
+        finally:
+            for connection in self.connections:
+                connection.close()
+
+    def deliver(self, messages):
+        #each pool thread keeps its own open connection across batches
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = get_connection()
+            with self.lock:
+                self.connections.append(connection)
+        try:
+            connection.open()
+        except Exception as exc:
+            return [], [(message, repr(exc)) for message in messages]
+        sent, failed = send_batch(messages, connection)
+        if failed:
+            #drop a possibly broken connection, the next batch reconnects
+            connection.close()
+        return sent, failed
@@ -0,0 +1,198 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from rest_framework.serializers import BaseSerializer
+
+from .cache import response_cache
+
+
+logger = logging.getLogger('api.health')
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SLOW_REQUEST_MS': 500,
+    'SLOW_REQUEST_TOP_SQL': 3,
+    'ALLOWED_IPS': ['127.0.0.1', '::1'],
+}
+
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+QUERY_BUCKETS = [0, 1, 2, 5, 10, 20, 50, 100]
+
+HISTOGRAMS = [
+    ('api_request_duration_seconds', 'Wall time per request.', 'duration'),
+    ('api_request_queries', 'Database queries per request.', 'queries'),
+]
+COUNTERS = [
+    ('api_request_db_seconds_total', 'Time spent in database queries.', 'db_seconds'),
+    ('api_request_serializer_seconds_total', 'Time spent in serializers.', 'serializer_seconds'),
+    ('api_response_bytes_total', 'Response body bytes sent.', 'response_bytes'),
+]
+
+current_request = ContextVar('current_request', default=None)
+
+
+def metrics_settings():
+    return {**DEFAULTS, **getattr(settings, 'PERF_METRICS', {})}
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'db_time', 'serializer_time', 'serializer_depth')
+
+    def __init__(self):
+        self.queries = Counter()
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+
+#installed on every connection as it opens, only records while a request is being measured
+def collect_query(execute, sql, params, many, context):
+    record = current_request.get()
+    if record is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record.db_time += time.perf_counter() - start
+        record.queries[sql] += 1
+
+
+def install_query_collector(connection):
+    if collect_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(collect_query)
+
+
+#each thread has its own connections, and under ASGI the ORM runs on executor threads, not the request's
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    if metrics_settings()['ENABLED']:
+        install_query_collector(connection)
+
+
+def install_serializer_timer():
+    if getattr(BaseSerializer.data.fget, 'timed', False):
+        return
+    untimed = BaseSerializer.data.fget
+
+    def timed_data(serializer):
+        record = current_request.get()
+        if record is None or record.serializer_depth:
+            return untimed(serializer)
+        record.serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return untimed(serializer)
+        finally:
+            record.serializer_time += time.perf_counter() - start
+            record.serializer_depth -= 1
+
+    timed_data.timed = True
+    BaseSerializer.data = property(timed_data)
+
+
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class RouteStats:
+    __slots__ = ('duration', 'queries', 'db_seconds', 'serializer_seconds', 'response_bytes')
+
+    def __init__(self):
+        self.duration = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.response_bytes = 0
+
+
+class MetricsStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes = {}
+
+    def record(self, route, method, duration, record, response_bytes):
+        with self._lock:
+            stats = self.routes.get((route, method))
+            if stats is None:
+                stats = self.routes[(route, method)] = RouteStats()
+            stats.duration.observe(duration)
+            stats.queries.observe(sum(record.queries.values()))
+            stats.db_seconds += record.db_time
+            stats.serializer_seconds += record.serializer_time
+            stats.response_bytes += response_bytes
+
+    def reset(self):
+        with self._lock:
+            self.routes = {}
+
+    def render(self):
+        lines = []
+        with self._lock:
+            routes = sorted(self.routes.items())
+            for name, help_text, attr in HISTOGRAMS:
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for (route, method), stats in routes:
+                    lines += render_histogram(name, f'route="{route}",method="{method}"', getattr(stats, attr))
+            for name, help_text, attr in COUNTERS:
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                for (route, method), stats in routes:
+                    lines.append(f'{name}{{route="{route}",method="{method}"}} {getattr(stats, attr)}')
+        cache_stats = response_cache.stats()
+        lines += ['# HELP api_response_cache_total Catalog response cache lookups.', '# TYPE api_response_cache_total counter']
+        for result in ('hits', 'misses', 'invalidations'):
+            lines.append(f'api_response_cache_total{{result="{result}"}} {cache_stats[result]}')
+        return '\n'.join(lines) + '\n'
+
+
+def render_histogram(name, labels, histogram):
+    lines, cumulative = [], 0
+    for bound, count in zip(histogram.bounds, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+    lines.append(f'{name}_sum{{{labels}}} {histogram.total}')
+    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+    return lines
+
+
+store = MetricsStore()
+
+
+def metrics_view(request):
+    allowed = metrics_settings()['ALLOWED_IPS']
+    if allowed is not None and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(store.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def health_view(request):
+    #for load balancers: is this worker able to reach the database right now; the why goes to the log, not the caller
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except DatabaseError:
+        logger.warning('health check could not reach the database', exc_info=True)
+        return JsonResponse({'database': 'unavailable'}, status=503)
+    return JsonResponse({'database': 'ok'})
+
@@ -0,0 +1,165 @@
+import gzip
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from .metrics import (
+    RequestMetrics,
+    current_request,
+    install_serializer_timer,
+    metrics_settings,
+    store,
+)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+logger = logging.getLogger('api.perf')
+
+COMPRESSION_DEFAULTS = {
+    'ENABLED': True,
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+    'CONTENT_TYPES': ['application/json', 'application/x-ndjson', 'text/'],
+}
+
+
+class PerformanceMiddleware:
+    """
+    Records wall time, query count, database time, serializer time and body
+    size for every request under its resolved route name (``cart-create-order``)
+    and logs slow requests with their most repeated SQL.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = metrics_settings()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.slow_seconds = config['SLOW_REQUEST_MS'] / 1000
+        self.top_sql = config['SLOW_REQUEST_TOP_SQL']
+        self.get_response = get_response
+        install_serializer_timer()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        record = RequestMetrics()
+        token = current_request.set(record)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.finish(request, response, record, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        record = RequestMetrics()
+        token = current_request.set(record)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.finish(request, response, record, time.perf_counter() - start)
+        return response
+
+    def finish(self, request, response, record, duration):
+        match = request.resolver_match
+        route = match.view_name if match else 'unresolved'
+        size = 0 if response.streaming else len(response.content)
+        store.record(route, request.method, duration, record, size)
+        if duration >= self.slow_seconds:
+            logger.warning(
+                'slow request %s %s (%s) %.1f ms, %d queries, %.1f ms db, %.1f ms serializing; top sql: %s',
+                request.method, request.path, route, duration * 1000, sum(record.queries.values()),
+                record.db_time * 1000, record.serializer_time * 1000,
+                [f'{count}x {sql}' for sql, count in record.queries.most_common(self.top_sql)],
+            )
+
+
+def compression_settings():
+    return {**COMPRESSION_DEFAULTS, **getattr(settings, 'COMPRESSION', {})}
+
+
+def accepted_encodings(header):
+    """``{coding: q}`` from an Accept-Encoding header, leaving out codings refused with q=0."""
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding and q > 0:
+            accepted[coding.lower()] = q
+    return accepted
+
+
+def choose_encoding(header):
+    accepted = accepted_encodings(header)
+    wildcard = accepted.get('*', 0)
+    offers = [('br', accepted.get('br', wildcard))] if brotli is not None else []
+    offers.append(('gzip', accepted.get('gzip', wildcard)))
+    #brotli wins ties, it is smaller at a comparable speed
+    coding, q = max(offers, key=lambda offer: offer[1])
+    return coding if q > 0 else None
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress text and JSON bodies of at least ``MIN_SIZE`` bytes with brotli
+    when the client accepts it and the module is installed, otherwise gzip.
+    Streaming responses are left alone; exports compress themselves.
+    """
+
+    def __init__(self, get_response):
+        config = compression_settings()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.config = config
+        super().__init__(get_response)
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if not any(content_type.startswith(prefix) for prefix in self.config['CONTENT_TYPES']):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < self.config['MIN_SIZE']:
+            return response
+        coding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if coding is None:
+            return response
+        if coding == 'br':
+            body = brotli.compress(response.content, quality=self.config['BROTLI_QUALITY'])
+        else:
+            body = gzip.compress(response.content, compresslevel=self.config['GZIP_LEVEL'], mtime=0)
+        if len(body) >= len(response.content):
+            return response
+        response.content = body
+        response['Content-Length'] = str(len(body))
+        response['Content-Encoding'] = coding
+        #the bytes changed, so a strong validator would be wrong; weak ones still match If-None-Match
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = f'W/{etag}'
+        return response
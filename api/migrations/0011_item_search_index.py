@@ -0,0 +1,34 @@
+from django.db import migrations
+
+from api.search import get_backend
+
+
+def create_search_index(apps, schema_editor):
+    backend = get_backend(schema_editor.connection)
+    if backend is None:
+        return
+    for sql in backend.create_sql:
+        schema_editor.execute(sql)
+    Item = apps.get_model('api', 'Item')
+    items = Item.objects.using(schema_editor.connection.alias).only('name', 'description').iterator(chunk_size=2000)
+    with schema_editor.connection.cursor() as cursor:
+        backend.index(cursor, ((item.pk, item.name, item.description) for item in items))
+
+
+def drop_search_index(apps, schema_editor):
+    backend = get_backend(schema_editor.connection)
+    if backend is None:
+        return
+    for sql in backend.drop_sql:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_rename_items_orderitem_item'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:50
+
+import api.models
+from django.db import migrations, models
+
+
+def backfill_rating_stats(apps, schema_editor):
+    from api.ratings import rebuild_rating_stats
+    rebuild_rating_stats(apps.get_model('api', 'Item'), apps.get_model('api', 'Review'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_item_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='rating_average',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=4),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='rating_histogram',
+            field=models.JSONField(default=api.models.empty_rating_histogram),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_stats, migrations.RunPython.noop),
+    ]
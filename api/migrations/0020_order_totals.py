@@ -0,0 +1,38 @@
+from django.db import migrations, models
+
+
+def backfill_order_totals(apps, schema_editor):
+    from api.orders import backfill_order_totals
+    backfill_order_totals(apps.get_model('api', 'Order'), apps.get_model('api', 'OrderItem'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_sales_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_order_totals, migrations.RunPython.noop),
+    ]
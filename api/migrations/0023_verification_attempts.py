@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='verification_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -10,24 +11,71 @@ class User(AbstractUser):
     full_name = models.CharField(max_length=100)
     password = models.CharField(max_length=20)
     verification_code = models.CharField(max_length=6, blank=True, null=True)
+    #wrong guesses at the current code, which is dropped once they reach the limit
+    verification_attempts = models.PositiveSmallIntegerField(default=0)
     is_verified = models.BooleanField(default=False)
+    #bumped whenever the claims baked into issued tokens go stale
+    token_version = models.PositiveIntegerField(default=0)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['email'], name='user_email_idx'),
+            models.Index(
+                fields=['verification_code'],
+                name='user_pending_code_idx',
+                condition=models.Q(is_verified=False, verification_code__isnull=False),
+            ),
+        ]
     
 
+def empty_rating_histogram():
+    return [0] * 10
+
+
 class Item(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     seller = models.ForeignKey(User, on_delete=models.CASCADE)
+    #denormalized review stats, maintained by api.ratings
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_average = models.DecimalField(max_digits=4, decimal_places=2, default=0, db_index=True)
+    rating_histogram = models.JSONField(default=empty_rating_histogram)
+    #change tracking for conditional requests; bulk writers must set it themselves
+    updated_at = models.DateTimeField(auto_now=True)
+    #seller's own stock keeping code, the key bulk imports update by
+    sku = models.CharField(max_length=64, blank=True, null=True)
+    #units on hand, None when the seller does not track stock; see api.stock
+    stock = models.PositiveIntegerField(null=True, blank=True)
+    #above zero the stock lives in this many StockShard rows instead, for items hot enough to contend
+    stock_shards = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['seller', 'sku'], name='unique_seller_sku'),
+        ]
 
 
 class Order(models.Model):
     customer = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    #totals fixed at checkout from the lines' unit prices
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    item_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer', '-created_at', '-id'], name='order_customer_created_idx'),
+        ]
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, related_name='order_items', on_delete=models.CASCADE)
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
+    #the item's price when the order was placed
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
 
 
 class Profile(models.Model):
@@ -46,6 +94,12 @@ class CartItem(models.Model):
     cart = models.ForeignKey(Cart, related_name='items', on_delete=models.CASCADE)
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'item'], name='unique_cart_line'),
+        ]
 
     def __str__(self):
         return f"{self.quantity} x {self.item.name}"
@@ -71,6 +125,7 @@ class Review(models.Model):
     rating = models.IntegerField(choices=RATING_CHOICES)
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
 
 
@@ -86,6 +141,149 @@ class SupportRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     resolved = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='support_unresolved_idx', condition=models.Q(resolved=False)),
+        ]
+
     def __str__(self):
         return f"{self.subject} - {self.email}"
-    
\ No newline at end of file
+    
+
+class OutboundEmail(models.Model):
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    DEAD = 'dead'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (DEAD, 'Dead'),
+    ]
+
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to} ({self.status})"
+
+
+class ImportJob(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    seller = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='import_jobs', on_delete=models.CASCADE)
+    file = models.FileField(upload_to='imports/')
+    format = models.CharField(max_length=10)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    #rows already committed, a resumed run skips this many
+    rows_done = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    updated_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    lease_until = models.DateTimeField(null=True, blank=True)
+    #runs started, including ones whose worker died; the job fails once this reaches MAX_ATTEMPTS
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'lease_until'], name='import_job_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Import {self.pk} by {self.seller_id} ({self.status})"
+
+
+class SalesRollup(models.Model):
+    """Units and revenue per seller, item and calendar period, maintained by api.analytics."""
+    DAY = 'day'
+    WEEK = 'week'
+    MONTH = 'month'
+    PERIOD_CHOICES = [
+        (DAY, 'Day'),
+        (WEEK, 'Week'),
+        (MONTH, 'Month'),
+    ]
+
+    seller = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='sales_rollups', on_delete=models.CASCADE)
+    item = models.ForeignKey(Item, related_name='sales_rollups', on_delete=models.CASCADE)
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            #also the index behind every dashboard query: seller, period, then a date range
+            models.UniqueConstraint(fields=['seller', 'period', 'period_start', 'item'], name='unique_sales_rollup'),
+        ]
+
+
+
+class StockShard(models.Model):
+    item = models.ForeignKey(Item, related_name='stock_shard_rows', on_delete=models.CASCADE)
+    shard = models.PositiveSmallIntegerField()
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'shard'], name='unique_stock_shard'),
+        ]
+
+
+class StockReservation(models.Model):
+    item = models.ForeignKey(Item, on_delete=models.CASCADE)
+    #the shard the units came from, None for an unsharded item
+    shard = models.PositiveSmallIntegerField(null=True, blank=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at'], name='stock_reservation_expiry_idx'),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    #sha256 of the route and body, a reused key with a different request is refused
+    fingerprint = models.CharField(max_length=64)
+    #null while the first request is still running
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotency_expiry_idx'),
+        ]
@@ -0,0 +1,43 @@
+from decimal import Decimal
+
+from django.db.models import F
+
+
+def order_totals(lines):
+    """``subtotal``, ``total`` and ``item_count`` for ``(quantity, unit_price)`` pairs."""
+    subtotal, item_count = Decimal('0.00'), 0
+    for quantity, unit_price in lines:
+        subtotal += quantity * unit_price
+        item_count += quantity
+    #no shipping, tax or discounts yet, so the total is the subtotal
+    return {'subtotal': subtotal, 'total': subtotal, 'item_count': item_count}
+
+
+def backfill_order_totals(order_model, order_item_model, chunk_size=1000):
+    """
+    Snapshot each order line's unit price from its item and store the order
+    totals, walking orders by primary key so memory stays bounded by
+    ``chunk_size``. Lines written before snapshots existed can only take the
+    item's current price.
+    """
+    last_pk, updated = 0, 0
+    while True:
+        ids = list(order_model.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return updated
+        last_pk = ids[-1]
+        lines = list(
+            order_item_model.objects.filter(order_id__in=ids)
+            .annotate(price=F('item__price'))
+            .only('pk', 'order_id', 'quantity')
+        )
+        per_order = {pk: [] for pk in ids}
+        for line in lines:
+            line.unit_price = line.price
+            per_order[line.order_id].append((line.quantity, line.unit_price))
+        order_item_model.objects.bulk_update(lines, ['unit_price'])
+        order_model.objects.bulk_update(
+            [order_model(pk=pk, **order_totals(pairs)) for pk, pairs in per_order.items()],
+            ['subtotal', 'total', 'item_count'],
+        )
+        updated += len(ids)
@@ -0,0 +1,131 @@
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over an indexed, unique ordering so that every page is a
+    bounded range scan no matter how deep the client goes. Viewsets pick their
+    own ``page_size`` and ``cursor_ordering``; clients may shrink or grow the
+    page up to ``max_page_size``.
+
+    Every ordering ends in the primary key and the cursor holds the whole sort
+    key of the last row, so runs of equal prices or ratings are paged by
+    position like anything else instead of by an offset that stops at
+    ``offset_cutoff``.
+    """
+    ordering = '-id'
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = getattr(view, 'page_size', None) or self.page_size
+        self.ordering = getattr(view, 'cursor_ordering', None) or self.ordering
+        #the stock paginate_queryset, filtering on the whole sort key rather than its first column
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor or (0, False, None)
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self.after(ordering, current_position, queryset))
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following_position = len(results) > len(self.page)
+        following_position = self._get_position_from_instance(results[-1], self.ordering) if has_following_position else None
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        #unlike the stock paginator, ask every ordering-aware filter in turn, not just the first
+        ordering = self.ordering
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                backend_ordering = backend().get_ordering(request, queryset, view)
+                if backend_ordering:
+                    ordering = backend_ordering
+                    break
+        ordering = (ordering,) if isinstance(ordering, str) else tuple(ordering)
+        #a unique tiebreaker, running the same way as the leading column so one index still serves both
+        if not {'id', 'pk'} & {name.lstrip('-') for name in ordering}:
+            ordering += ('-id' if ordering[0].startswith('-') else 'id',)
+        return ordering
+
+    def after(self, ordering, position, queryset):
+        """Rows strictly past ``position`` in ``ordering``: a > x, or a = x and b > y, and so on."""
+        if not isinstance(position, list) or len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        clauses, equal = [], {}
+        for name, value in zip(ordering, position):
+            column = name.lstrip('-')
+            value = self.to_python(queryset, column, value)
+            lookup = '__lt' if name.startswith('-') else '__gt'
+            clauses.append(Q(**equal, **{column + lookup: value}))
+            equal[column] = value
+        return reduce(or_, clauses)
+
+    def to_python(self, queryset, column, value):
+        #the cursor is client-supplied, so a value its column can't hold is a bad cursor, not a 500
+        annotation = queryset.query.annotations.get(column)
+        if annotation is not None:
+            field = annotation.output_field
+        else:
+            field = queryset.model._meta.pk if column == 'pk' else queryset.model._meta.get_field(column)
+        try:
+            value = field.to_python(value)
+            field.run_validators(value)
+        except (TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return value
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+        try:
+            return cursor._replace(position=json.loads(cursor.position))
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, cursor):
+        if isinstance(cursor.position, list):
+            cursor = cursor._replace(position=json.dumps(cursor.position, separators=(',', ':')))
+        return super().encode_cursor(cursor)
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for name in ordering:
+            name = name.lstrip('-')
+            position.append(str(instance[name] if isinstance(instance, dict) else getattr(instance, name)))
+        return position
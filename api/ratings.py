@@ -0,0 +1,77 @@
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Item
+
+
+STATS_FIELDS = ['rating_count', 'rating_sum', 'rating_average', 'rating_histogram']
+
+
+def rating_average(total, count):
+    if not count:
+        return Decimal('0.00')
+    return (Decimal(total) / count).quantize(Decimal('0.01'))
+
+
+def stats_from_histogram(histogram):
+    count = sum(histogram)
+    total = sum(rating * n for rating, n in enumerate(histogram, start=1))
+    return {
+        'rating_count': count,
+        'rating_sum': total,
+        'rating_average': rating_average(total, count),
+        'rating_histogram': histogram,
+    }
+
+
+def record_rating(item_id, added=None, removed=None):
+    """
+    Move one review's rating into and/or out of an item's stats. The item row
+    is locked for the read-modify-write so concurrent reviews cannot lose counts.
+    """
+    with transaction.atomic():
+        item = Item.objects.select_for_update().only(*STATS_FIELDS).get(pk=item_id)
+        histogram = list(item.rating_histogram)
+        if removed is not None:
+            histogram[removed - 1] -= 1
+        if added is not None:
+            histogram[added - 1] += 1
+        for field, value in stats_from_histogram(histogram).items():
+            setattr(item, field, value)
+        item.save(update_fields=[*STATS_FIELDS, 'updated_at'])
+
+
+def rebuild_rating_stats(item_model, review_model, chunk_size=1000):
+    #walks items by primary key so memory stays bounded by chunk_size
+    last_pk, updated = 0, 0
+    try:
+        item_model._meta.get_field('updated_at')
+        stamp = {'updated_at': timezone.now()}
+    except FieldDoesNotExist:
+        #historical models from before change tracking
+        stamp = {}
+    while True:
+        ids = list(
+            item_model.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return updated
+        last_pk = ids[-1]
+        histograms = {pk: [0] * 10 for pk in ids}
+        grouped = (
+            review_model.objects.filter(item_id__in=ids)
+            .values_list('item_id', 'rating')
+            .annotate(reviews=Count('id'))
+            .order_by()
+        )
+        for item_id, rating, reviews in grouped:
+            histograms[item_id][rating - 1] = reviews
+        item_model.objects.bulk_update(
+            [item_model(pk=pk, **stats_from_histogram(histogram), **stamp) for pk, histogram in histograms.items()],
+            [*STATS_FIELDS, *stamp],
+        )
+        updated += len(ids)
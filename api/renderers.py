@@ -0,0 +1,148 @@
+"""
+JSON encoding for the api. orjson is used when it is installed and the
+stdlib ``json`` module otherwise; ``JSON_CODEC['BACKEND']`` can force either.
+Both write compact UTF-8 and turn ``Decimal`` into its exact string, the way
+DRF already renders decimal fields, instead of rounding it through a float.
+"""
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.functional import Promise
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.json import strict_constant
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+DEFAULTS = {
+    # 'auto', 'orjson' or 'stdlib'
+    'BACKEND': 'auto',
+}
+
+
+def codec_settings():
+    return {**DEFAULTS, **getattr(settings, 'JSON_CODEC', {})}
+
+
+class DecimalStringEncoder(JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return str(obj)
+        return super().default(obj)
+
+
+class StdlibCodec:
+    name = 'stdlib'
+
+    def __init__(self):
+        self.encoder = DecimalStringEncoder(ensure_ascii=False, separators=(',', ':'), allow_nan=False)
+
+    def dumps(self, data):
+        return self.encoder.encode(data).encode()
+
+    def loads(self, raw):
+        return json.loads(raw, parse_constant=strict_constant)
+
+
+class OrjsonCodec:
+    name = 'orjson'
+    #everything orjson cannot encode natively goes through DRF's encoder
+    fallback = DecimalStringEncoder()
+
+    @staticmethod
+    def default(obj):
+        if isinstance(obj, (Decimal, Promise)):
+            return str(obj)
+        return OrjsonCodec.fallback.default(obj)
+
+    def dumps(self, data):
+        #datetimes go through DRF too, so both codecs format them the same way
+        return orjson.dumps(data, default=self.default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+
+    def loads(self, raw):
+        return orjson.loads(raw)
+
+
+CODECS = {'stdlib': StdlibCodec, 'orjson': OrjsonCodec}
+_codec = None
+
+
+def get_codec():
+    global _codec
+    if _codec is None:
+        backend = codec_settings()['BACKEND']
+        if backend == 'auto':
+            backend = 'orjson' if orjson is not None else 'stdlib'
+        if backend == 'orjson' and orjson is None:
+            raise ImportError("JSON_CODEC['BACKEND'] is 'orjson' but orjson is not installed")
+        _codec = CODECS[backend]()
+    return _codec
+
+
+@receiver(setting_changed)
+def reset_codec(setting, **kwargs):
+    global _codec
+    if setting == 'JSON_CODEC':
+        _codec = None
+
+
+def dumps(data):
+    #like DRF, escape the two line separators that are valid JSON but not javascript
+    return get_codec().dumps(data).replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+def json_response(data, status=200):
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer on the configured codec. An ``indent`` in the Accept header falls back to DRF's own output."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class StreamRenderer(BaseRenderer):
+    """
+    Lets content negotiation accept a media type that the view streams itself,
+    so nothing goes through it on success. Errors raised before the stream
+    starts are still written as JSON and labelled that way.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json'
+        return b'' if data is None else dumps(data)
+
+
+class CSVStreamRenderer(StreamRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONStreamRenderer(StreamRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class FastJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return get_codec().loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
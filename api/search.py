@@ -0,0 +1,210 @@
+import re
+from itertools import islice
+
+from django.db import connection
+from django.db.models import Case, FloatField, When, Q, Value
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+
+TERM_RE = re.compile(r'[^\W_]+')
+
+
+def search_terms(query):
+    return TERM_RE.findall(query.lower())
+
+
+def chunked(rows, size=1000):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def ranked_page(cursor, hits_sql, params, limit, after=None, reverse=False):
+    """
+    Up to ``limit`` ``(id, score)`` rows of ``hits_sql``, best first: lowest
+    score, then lowest id. With ``after = (score, id)`` the page starts just
+    past that row, or ends just before it when ``reverse``.
+    """
+    op, direction = ('<', 'DESC') if reverse else ('>', 'ASC')
+    where = ''
+    if after is not None:
+        where = f'WHERE score {op} %s OR (score = %s AND id {op} %s)'
+        params = [*params, after[0], after[0], after[1]]
+    cursor.execute(
+        f'SELECT id, score FROM ({hits_sql}) hits {where} ORDER BY score {direction}, id {direction} LIMIT %s',
+        [*params, limit],
+    )
+    return cursor.fetchall()
+
+
+#sqlite: fts5 virtual table keyed by item id
+class SQLiteSearchBackend:
+    table = 'api_item_fts'
+
+    create_sql = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+        "name, description, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    ]
+    drop_sql = [f'DROP TABLE IF EXISTS {table}']
+
+    def index(self, cursor, rows):
+        for batch in chunked(rows):
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(pk,) for pk, _, _ in batch])
+            cursor.executemany(f'INSERT INTO {self.table} (rowid, name, description) VALUES (%s, %s, %s)', batch)
+
+    def remove(self, cursor, pk):
+        cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [pk])
+
+    def clear(self, cursor):
+        cursor.execute(f'DELETE FROM {self.table}')
+
+    def hits(self, terms):
+        match = ' '.join(f'"{term}"*' for term in terms)
+        # name hits weigh ten times description hits; bm25 is lower for a better match
+        return f'SELECT rowid AS id, bm25({self.table}, 10.0, 1.0) AS score FROM {self.table} WHERE {self.table} MATCH %s', [match]
+
+    def search(self, cursor, terms, limit, after=None, reverse=False):
+        return ranked_page(cursor, *self.hits(terms), limit, after, reverse)
+
+
+#postgres: weighted tsvector side table with a gin index
+class PostgresSearchBackend:
+    table = 'api_item_search'
+    document = "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B')"
+
+    create_sql = [
+        f'CREATE TABLE IF NOT EXISTS {table} ('
+        'item_id bigint PRIMARY KEY REFERENCES api_item (id) ON DELETE CASCADE, '
+        'document tsvector NOT NULL)',
+        f'CREATE INDEX IF NOT EXISTS {table}_document_gin ON {table} USING GIN (document)',
+    ]
+    drop_sql = [f'DROP TABLE IF EXISTS {table}']
+
+    def index(self, cursor, rows):
+        for batch in chunked(rows):
+            cursor.executemany(
+                f'INSERT INTO {self.table} (item_id, document) VALUES (%s, {self.document}) '
+                'ON CONFLICT (item_id) DO UPDATE SET document = EXCLUDED.document',
+                batch,
+            )
+
+    def remove(self, cursor, pk):
+        cursor.execute(f'DELETE FROM {self.table} WHERE item_id = %s', [pk])
+
+    def clear(self, cursor):
+        cursor.execute(f'TRUNCATE {self.table}')
+
+    def hits(self, terms):
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        #negated so lower is better as with bm25, and float8 so the cursor's score compares exactly
+        hits_sql = (
+            f"SELECT item_id AS id, -ts_rank(document, query)::float8 AS score FROM {self.table}, "
+            "to_tsquery('simple', %s) query WHERE document @@ query"
+        )
+        return hits_sql, [tsquery]
+
+    def search(self, cursor, terms, limit, after=None, reverse=False):
+        return ranked_page(cursor, *self.hits(terms), limit, after, reverse)
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend(conn=None):
+    backend_class = BACKENDS.get((conn or connection).vendor)
+    return backend_class() if backend_class else None
+
+
+def index_items(items, conn=None):
+    conn = conn or connection
+    backend = get_backend(conn)
+    if backend is None:
+        return
+    with conn.cursor() as cursor:
+        backend.index(cursor, ((item.pk, item.name, item.description) for item in items))
+
+
+def remove_item(pk, conn=None):
+    conn = conn or connection
+    backend = get_backend(conn)
+    if backend is None:
+        return
+    with conn.cursor() as cursor:
+        backend.remove(cursor, pk)
+
+
+class ItemSearchFilter(BaseFilterBackend):
+    """
+    Ranked prefix search over item name and description using the database's
+    full-text index. Every term must match and results come back best first.
+    Under cursor pagination the full-text query itself starts at the cursor's
+    ``(search_rank, id)``, so each page reads one window of hits however deep
+    it is and no match is left out; without a paginator the first
+    ``max_results`` are returned. With an explicit ``?ordering=`` the rows
+    are restricted to every match by a subquery on the index and ordered and
+    paged like any other list. Databases without a full-text backend fall
+    back to ``icontains`` matching.
+    """
+    search_param = api_settings.SEARCH_PARAM
+    max_results = 1000
+
+    def is_ranked(self, request):
+        return bool(search_terms(request.query_params.get(self.search_param, ''))) and get_backend() is not None
+
+    def get_ordering(self, request, queryset, view):
+        #consulted by cursor pagination, which would otherwise discard the ranking
+        if self.is_ranked(request):
+            return ('search_rank',)
+        return None
+
+    def filter_queryset(self, request, queryset, view):
+        terms = search_terms(request.query_params.get(self.search_param, ''))
+        if not terms:
+            return queryset
+        backend = get_backend()
+        if backend is None:
+            condition = Q()
+            for term in terms:
+                condition &= Q(name__icontains=term) | Q(description__icontains=term)
+            return queryset.filter(condition)
+        paginator = getattr(view, 'paginator', None)
+        if not self.is_rank_ordered(request, queryset, view, paginator):
+            #another ordering pages the rows itself, so every match has to be there for it to sort
+            hits_sql, params = backend.hits(terms)
+            return queryset.filter(pk__in=RawSQL(f'SELECT id FROM ({hits_sql}) hits', params))
+        after, reverse = self.cursor_position(request, queryset, paginator)
+        #enough hits for the largest page the paginator serves, plus the one that tells it a next page exists
+        limit = paginator.max_page_size + 1 if getattr(paginator, 'max_page_size', None) else self.max_results
+        with connection.cursor() as cursor:
+            hits = backend.search(cursor, terms, limit, after, reverse)
+        if not hits:
+            return queryset.annotate(search_rank=Value(0.0)).none()
+        ranking = Case(*(When(pk=pk, then=Value(score)) for pk, score in hits), output_field=FloatField())
+        return queryset.filter(pk__in=[pk for pk, _ in hits]).annotate(search_rank=ranking).order_by('search_rank', 'pk')
+
+    def is_rank_ordered(self, request, queryset, view, paginator):
+        if hasattr(paginator, 'get_ordering'):
+            return paginator.get_ordering(request, queryset, view)[0] == 'search_rank'
+        #without the paginator to ask, the first ordering-aware backend decides, as it would
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                if ordering:
+                    return ordering[0] == 'search_rank'
+        return True
+
+    def cursor_position(self, request, queryset, paginator):
+        """The ``(score, id)`` the requested page starts from, read off the pagination cursor, and its direction."""
+        cursor = paginator.decode_cursor(request) if hasattr(paginator, 'decode_cursor') else None
+        if cursor is None or not isinstance(cursor.position, list) or len(cursor.position) != 2:
+            return None, False
+        try:
+            return (float(cursor.position[0]), paginator.to_python(queryset, 'id', cursor.position[1])), cursor.reverse
+        except (TypeError, ValueError):
+            raise NotFound(paginator.invalid_cursor_message)
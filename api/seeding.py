@@ -0,0 +1,95 @@
+import random
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .analytics import rebuild_rollups
+from .cache import invalidate_all
+from .models import User, Item, Cart, CartItem, Order, OrderItem, Review, Favorite
+from .orders import order_totals
+from .ratings import rebuild_rating_stats
+from .search import index_items
+
+
+ADJECTIVES = ['red', 'oak', 'steel', 'vintage', 'compact', 'wireless', 'organic', 'leather', 'smart', 'linen']
+NOUNS = ['lamp', 'desk', 'chair', 'kettle', 'backpack', 'speaker', 'blanket', 'mug', 'watch', 'jacket']
+
+SCALE = {
+    'customers': 1000,
+    'sellers': 50,
+    'items_per_seller': 40,
+    'orders_per_customer': 3,
+    'lines_per_order': 3,
+    'cart_lines': 2,
+    'reviews_per_item': 5,
+    'favorites_per_customer': 5,
+}
+
+
+def seed_dataset(scale=1.0, seed=0, batch_size=2000, password='password', **counts):
+    """
+    Bulk-insert a realistic marketplace. ``scale`` multiplies the number of
+    customers and sellers in ``SCALE``; keyword arguments override single
+    counts. Derived state (search index, rating stats, sales rollups, response
+    cache) is brought up to date at the end. Returns the created customers and sellers.
+    """
+    rng = random.Random(seed)
+    scaled = {name: max(1, round(SCALE[name] * scale)) for name in ('customers', 'sellers')}
+    counts = {**SCALE, **scaled, **counts}
+    password_hash = make_password(password)
+    #usernames stay unique across runs, everything else follows the seed
+    prefix = uuid.uuid4().hex[:8]
+
+    with transaction.atomic():
+        sellers = User.objects.bulk_create([
+            User(username=f'{prefix}-seller{i}', email=f'{prefix}-seller{i}@example.com', password=password_hash,
+                 full_name=f'Seller {i}', is_seller=True, is_verified=True)
+            for i in range(counts['sellers'])
+        ], batch_size=batch_size)
+        customers = User.objects.bulk_create([
+            User(username=f'{prefix}-customer{i}', email=f'{prefix}-customer{i}@example.com', password=password_hash,
+                 full_name=f'Customer {i}', is_verified=True)
+            for i in range(counts['customers'])
+        ], batch_size=batch_size)
+        items = Item.objects.bulk_create([
+            Item(
+                name=f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}',
+                description=' '.join(rng.choices(ADJECTIVES + NOUNS, k=12)),
+                price=Decimal(rng.randrange(100, 50000)) / 100,
+                seller=seller,
+            )
+            for seller in sellers for i in range(counts['items_per_seller'])
+        ], batch_size=batch_size)
+        carts = Cart.objects.bulk_create([Cart(user=customer) for customer in customers], batch_size=batch_size)
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, item=item, quantity=rng.randint(1, 3))
+            for cart in carts for item in rng.sample(items, min(counts['cart_lines'], len(items)))
+        ], batch_size=batch_size)
+        baskets = [
+            (customer, [(item, rng.randint(1, 3)) for item in rng.sample(items, min(counts['lines_per_order'], len(items)))])
+            for customer in customers for _ in range(counts['orders_per_customer'])
+        ]
+        orders = Order.objects.bulk_create([
+            Order(customer=customer, **order_totals((quantity, item.price) for item, quantity in basket))
+            for customer, basket in baskets
+        ], batch_size=batch_size)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, item=item, quantity=quantity, unit_price=item.price)
+            for order, (_, basket) in zip(orders, baskets) for item, quantity in basket
+        ], batch_size=batch_size)
+        Review.objects.bulk_create([
+            Review(user=rng.choice(customers), item=item, rating=rng.randint(1, 10), comment='seeded review')
+            for item in items for _ in range(counts['reviews_per_item'])
+        ], batch_size=batch_size)
+        Favorite.objects.bulk_create([
+            Favorite(user=customer, item=item)
+            for customer in customers for item in rng.sample(items, min(counts['favorites_per_customer'], len(items)))
+        ], batch_size=batch_size)
+
+        index_items(items)
+        rebuild_rating_stats(Item, Review)
+        rebuild_rollups()
+    invalidate_all('item')
+    return customers, sellers
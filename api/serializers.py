@@ -1,5 +1,8 @@
 from rest_framework import serializers
 
+from .carts import MAX_LINE_QUANTITY
+from .fieldsets import SparseFieldsMixin
+
 
 from .models import(
     Profile, 
@@ -12,6 +15,7 @@ from .models import(
     Favorite,
     Review,
     SupportRequest,
+    ImportJob,
 )
 
 
@@ -29,6 +33,7 @@ class UserSerializer(serializers.ModelSerializer):
 
 #verification serializer
 class VerificationCodeSerializer(serializers.Serializer):
+    email = serializers.EmailField()
     code = serializers.CharField(max_length=6)
 
 
@@ -69,36 +74,92 @@ class ProfileSerializer(serializers.ModelSerializer):
         return profile
     
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class SellerSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'full_name']
+
+
+class ItemSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Item
+        fields = ['id', 'sku', 'name', 'price']
+
+
+class OrderItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     item = serializers.PrimaryKeyRelatedField(queryset=Item.objects.all())
+    expandable_fields = {
+        'item': ('item', lambda: ItemSummarySerializer(read_only=True)),
+    }
+
     class Meta:
         model = OrderItem
-        fields = ['id', 'item', 'quantity']
-        read_only_fields = ['id', 'order']
+        fields = ['id', 'item', 'quantity', 'unit_price']
+        read_only_fields = ['id', 'order', 'unit_price']
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     order_items = OrderItemSerializer(many=True, read_only=True)  # Use the related name here
+    expandable_fields = {
+        'order_items.item': ('order_items', lambda: OrderItemSerializer(many=True, read_only=True, expand=['item'])),
+    }
 
     class Meta:
         model = Order
-        fields = ['id', 'customer', 'order_items', 'created_at']
-        read_only_fields = ['id', 'customer', 'created_at']
+        fields = ['id', 'customer', 'order_items', 'subtotal', 'total', 'item_count', 'created_at']
+        read_only_fields = ['id', 'customer', 'subtotal', 'total', 'item_count', 'created_at']
 
 
 #item serializers
-class ItemSerializer(serializers.ModelSerializer):
+class ItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    cache_version = 1  # bump when the representation changes without a field change
+    expandable_fields = {
+        'seller': ('seller', lambda: SellerSummarySerializer(read_only=True)),
+    }
+
     class Meta:
         model = Item
-        fields = ['id', 'name', 'description', 'price', 'seller']
-        read_only_fields = ['id', 'seller']
+        fields = ['id', 'sku', 'name', 'description', 'price', 'seller', 'rating_count', 'rating_average', 'rating_histogram']
+        read_only_fields = ['id', 'seller', 'rating_count', 'rating_average', 'rating_histogram']
+
+    def validate_sku(self, value):
+        value = value or None
+        #a seller's skus are unique; imports carry no seller here because they update by sku on purpose
+        if self.instance is not None:
+            seller_id = self.instance.seller_id
+        else:
+            seller_id = getattr(getattr(self.context.get('request'), 'user', None), 'pk', None)
+        if value is not None and seller_id is not None:
+            clashes = Item.objects.filter(seller_id=seller_id, sku=value)
+            if self.instance is not None:
+                clashes = clashes.exclude(pk=self.instance.pk)
+            if clashes.exists():
+                raise serializers.ValidationError('You already have an item with this sku.')
+        return value
 
     def create(self, validated_data):
         request = self.context.get('request')
-        seller = request.user
-        item = Item.objects.create(seller=seller, **validated_data)
+        validated_data.setdefault('seller', request.user)
+        item = Item.objects.create(**validated_data)
         return item
-    
+
+    def update(self, instance, validated_data):
+        #write only what the seller edited, stock and the rating counters move under their own conditional updates
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
+
+
+class StockSerializer(serializers.Serializer):
+    on_hand = serializers.IntegerField(min_value=0, allow_null=True)
+    shards = serializers.IntegerField(min_value=0, default=0)
+
+    def validate_shards(self, value):
+        if value > self.context['max_shards']:
+            raise serializers.ValidationError(f"At most {self.context['max_shards']} shards.")
+        return value
+
 
 #cart serializer
 class CartItemSerializer(serializers.ModelSerializer):
@@ -115,6 +176,31 @@ class CartSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'items']
 
 
+class CartOperationSerializer(serializers.Serializer):
+    OPERATIONS = ['add', 'set', 'remove']
+
+    op = serializers.ChoiceField(choices=OPERATIONS, default='add')
+    item_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, max_value=MAX_LINE_QUANTITY, default=1)
+
+    def validate(self, attrs):
+        if attrs['op'] == 'add' and attrs['quantity'] < 1:
+            raise serializers.ValidationError({'quantity': 'Ensure this value is greater than or equal to 1.'})
+        return attrs
+
+
+class CartBatchSerializer(serializers.Serializer):
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=500)
+
+    def validate_operations(self, operations):
+        item_ids = {operation['item_id'] for operation in operations}
+        found = set(Item.objects.filter(pk__in=item_ids).values_list('pk', flat=True))
+        missing = item_ids - found
+        if missing:
+            raise serializers.ValidationError(f'Items not found: {sorted(missing)}')
+        return operations
+
+
 #favourie items
 class FavoriteSerializer(serializers.ModelSerializer):
     class Meta:
@@ -123,10 +209,94 @@ class FavoriteSerializer(serializers.ModelSerializer):
         read_only_fields = ['user', 'created_at']
 
 
+#largest key a BigAutoField holds, a bigger id would overflow the database integer
+MAX_ID = 2 ** 63 - 1
+
+
+class FavoriteBatchSerializer(serializers.Serializer):
+    item_ids = serializers.ListField(child=serializers.IntegerField(min_value=1, max_value=MAX_ID), allow_empty=False, max_length=500)
+
+
+class FavoriteLookupSerializer(serializers.Serializer):
+    items = serializers.CharField()
+
+    def validate_items(self, value):
+        item_id = serializers.IntegerField(min_value=1, max_value=MAX_ID)
+        try:
+            item_ids = {item_id.run_validation(part.strip()) for part in value.split(',') if part.strip()}
+        except serializers.ValidationError:
+            raise serializers.ValidationError('A comma separated list of item ids is required.')
+        if not item_ids or len(item_ids) > 200:
+            raise serializers.ValidationError('Between 1 and 200 item ids are required.')
+        return item_ids
+
+
 class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
         fields = ['id', 'user', 'item', 'rating', 'comment', 'created_at']
+        read_only_fields = ['user', 'created_at']
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    output = serializers.ChoiceField(choices=['csv', 'ndjson'], default='csv')
+    gzip = serializers.BooleanField(default=False)
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+    seller = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if 'since' in attrs and 'until' in attrs and attrs['since'] >= attrs['until']:
+            raise serializers.ValidationError({'until': 'Must be after since.'})
+        return attrs
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'format', 'status', 'rows_done', 'created_count', 'updated_count', 'error_count', 'errors',
+            'created_at', 'finished_at',
+        ]
+        read_only_fields = fields
+
+
+class SalesQuerySerializer(serializers.Serializer):
+    period = serializers.ChoiceField(choices=['day', 'week', 'month'], default='day')
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    top = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+    def validate(self, attrs):
+        if 'start' in attrs and 'end' in attrs and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError({'end': 'Must not be before start.'})
+        return attrs
+
+
+class ItemRatingQuerySerializer(serializers.Serializer):
+    min_rating = serializers.DecimalField(max_digits=4, decimal_places=2, min_value=0, required=False)
+    min_reviews = serializers.IntegerField(min_value=0, max_value=2 ** 31 - 1, required=False)
+
+
+class SalesPointSerializer(serializers.Serializer):
+    period_start = serializers.DateField()
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class TopItemSerializer(serializers.Serializer):
+    item_id = serializers.IntegerField()
+    name = serializers.CharField()
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class SalesDashboardSerializer(serializers.Serializer):
+    period = serializers.CharField()
+    start = serializers.DateField()
+    end = serializers.DateField()
+    series = SalesPointSerializer(many=True)
+    top_items = TopItemSerializer(many=True)
 
 
 class SupportRequestSerializer(serializers.ModelSerializer):
@@ -0,0 +1,50 @@
+from django.db import connections
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .authentication import forget_user
+from .cache import invalidate_object
+from .models import User, Item
+from .search import index_items, remove_item
+
+
+SEARCH_FIELDS = {'name', 'description'}
+TOKEN_FIELDS = {'password', 'is_active', 'is_superuser', 'is_staff', 'is_seller', 'is_verified'}
+
+
+#catalog cache and search index upkeep, covers the api views and admin edits alike
+@receiver(post_save, sender=Item)
+def item_saved(sender, instance, created, using, update_fields=None, **kwargs):
+    invalidate_object('item', None if created else instance.pk)
+    if update_fields is None or SEARCH_FIELDS & set(update_fields):
+        index_items([instance], connections[using])
+
+
+@receiver(post_delete, sender=Item)
+def item_deleted(sender, instance, using, **kwargs):
+    invalidate_object('item', instance.pk)
+    remove_item(instance.pk, connections[using])
+
+
+#token revocation, a change to anything a token vouches for retires the user's outstanding tokens
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._token_version_bumped = False
+    if raw or instance._state.adding or (update_fields is not None and not TOKEN_FIELDS & set(update_fields)):
+        return
+    old = User.objects.filter(pk=instance.pk).values(*TOKEN_FIELDS, 'token_version').first()
+    if old and any(old[field] != getattr(instance, field) for field in TOKEN_FIELDS):
+        instance.token_version = old['token_version'] + 1
+        instance._token_version_bumped = True
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if getattr(instance, '_token_version_bumped', False) and update_fields is not None and 'token_version' not in update_fields:
+        User.objects.filter(pk=instance.pk).update(token_version=instance.token_version)
+    forget_user(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    forget_user(instance.pk)
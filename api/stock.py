@@ -0,0 +1,185 @@
+import random
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Q, Sum, When
+from django.utils import timezone
+
+from .models import Item, StockReservation, StockShard
+
+
+DEFAULTS = {
+    'RESERVATION_SECONDS': 600,
+    'RELEASE_BATCH_SIZE': 1000,
+    'MAX_SHARDS': 64,
+}
+
+
+def stock_settings():
+    return {**DEFAULTS, **getattr(settings, 'STOCK', {})}
+
+
+class OutOfStock(Exception):
+    def __init__(self, item_id):
+        super().__init__(f'Not enough stock for item {item_id}')
+        self.item_id = item_id
+
+
+class ReservationExpired(Exception):
+    pass
+
+
+def is_tracked(item):
+    return item.stock is not None or item.stock_shards > 0
+
+
+def stock_level(item):
+    if item.stock_shards:
+        return StockShard.objects.filter(item=item).aggregate(total=Sum('quantity'))['total'] or 0
+    return item.stock
+
+
+def set_stock(item, quantity, shards=0):
+    """
+    Set the units on hand, ``None`` to stop tracking. With ``shards`` the
+    units are spread evenly over that many rows so concurrent checkouts of
+    one item decrement different rows. Units held by open reservations are
+    not counted and go back on top when released, into whatever layout the
+    item has by then.
+    """
+    if quantity is None:
+        shards = 0
+    with transaction.atomic():
+        StockShard.objects.filter(item=item).delete()
+        if shards:
+            share, extra = divmod(quantity, shards)
+            StockShard.objects.bulk_create([
+                StockShard(item=item, shard=shard, quantity=share + (shard < extra)) for shard in range(shards)
+            ])
+        #the shards open holds were taken from may be gone, so point them at rows that exist now
+        StockReservation.objects.filter(item=item).update(shard=F('pk') % shards if shards else None)
+        #stock is not part of the cached item representation, so no invalidation or updated_at here
+        Item.objects.filter(pk=item.pk).update(stock=None if shards else quantity, stock_shards=shards)
+    item.stock, item.stock_shards = (None if shards else quantity), shards
+
+
+def take_spread(item_id, quantity):
+    """Slow path for a line no single shard covers: lock the item's shards and take from the fullest first."""
+    with transaction.atomic():
+        rows = list(StockShard.objects.select_for_update().filter(item_id=item_id).order_by('-quantity', 'shard'))
+        if sum(row.quantity for row in rows) < quantity:
+            raise OutOfStock(item_id)
+        pieces = []
+        for row in rows:
+            piece = min(row.quantity, quantity - sum(taken for _, taken in pieces))
+            if not piece:
+                break
+            row.quantity -= piece
+            pieces.append((row.shard, piece))
+        StockShard.objects.bulk_update(rows, ['quantity'])
+    return pieces
+
+
+def take(item_id, shards, quantity):
+    """
+    Decrement stock with a conditional UPDATE that only matches while enough
+    is left, so the database decides who gets the last unit and nothing is
+    read back first. Sharded items start at a random shard and move on when
+    it runs dry. Returns the ``(shard, quantity)`` pieces taken.
+    """
+    if not shards:
+        if not Item.objects.filter(pk=item_id, stock__gte=quantity).update(stock=F('stock') - quantity):
+            raise OutOfStock(item_id)
+        return [(None, quantity)]
+    start = random.randrange(shards)
+    for offset in range(shards):
+        shard = (start + offset) % shards
+        rows = StockShard.objects.filter(item_id=item_id, shard=shard, quantity__gte=quantity)
+        if rows.update(quantity=F('quantity') - quantity):
+            return [(shard, quantity)]
+    #enough may be left in total but spread too thin for this line
+    return take_spread(item_id, quantity)
+
+
+def reserve(user_id, lines):
+    """
+    Take stock for ``(item, quantity)`` lines and record holds expiring after
+    RESERVATION_SECONDS. This runs in its own short transaction, ahead of the
+    order's, so a hot item's row stays locked for a few statements rather
+    than the whole checkout. Items without tracked stock are skipped.
+    Raises OutOfStock, taking nothing, when any line cannot be covered.
+    """
+    expires_at = timezone.now() + timedelta(seconds=stock_settings()['RESERVATION_SECONDS'])
+    reservations = []
+    with transaction.atomic():
+        #a fixed lock order keeps two multi-item checkouts from deadlocking
+        for item, quantity in sorted(lines, key=lambda line: line[0].pk):
+            if not is_tracked(item):
+                continue
+            reservations.extend(
+                StockReservation(item_id=item.pk, shard=shard, user_id=user_id, quantity=piece, expires_at=expires_at)
+                for shard, piece in take(item.pk, item.stock_shards, quantity)
+            )
+        return StockReservation.objects.bulk_create(reservations)
+
+
+def consume(reservations):
+    """Turn holds into sales inside the order's transaction; fails if any was already released."""
+    ids = [reservation.pk for reservation in reservations]
+    if ids and StockReservation.objects.filter(pk__in=ids).delete()[0] != len(ids):
+        raise ReservationExpired()
+
+
+def restore(rows):
+    """Put ``(item_id, shard, quantity)`` back with one UPDATE per table."""
+    items, shards = defaultdict(int), defaultdict(int)
+    for item_id, shard, quantity in rows:
+        if shard is None:
+            items[item_id] += quantity
+        else:
+            shards[(item_id, shard)] += quantity
+    if items:
+        Item.objects.filter(pk__in=items).update(
+            stock=Case(*[When(pk=pk, then=F('stock') + quantity) for pk, quantity in items.items()]),
+        )
+    if shards:
+        match = Q()
+        for item_id, shard in shards:
+            match |= Q(item_id=item_id, shard=shard)
+        StockShard.objects.filter(match).update(quantity=Case(*[
+            When(item_id=item_id, shard=shard, then=F('quantity') + quantity)
+            for (item_id, shard), quantity in shards.items()
+        ]))
+
+
+def release(queryset, limit=None):
+    """
+    Return the held units of the matching reservations and delete them.
+    Rows another worker is releasing or consuming are skipped, so nothing is
+    put back twice.
+    """
+    with transaction.atomic():
+        rows = queryset.select_for_update(skip_locked=True).order_by('pk').values_list('pk', 'item_id', 'shard', 'quantity')
+        rows = list(rows[:limit] if limit else rows)
+        if not rows:
+            return 0
+        restore(row[1:] for row in rows)
+        StockReservation.objects.filter(pk__in=[row[0] for row in rows]).delete()
+    return len(rows)
+
+
+def release_reservations(reservations):
+    return release(StockReservation.objects.filter(pk__in=[reservation.pk for reservation in reservations]))
+
+
+def release_expired(batch_size=None):
+    """Release every expired hold, a batch per transaction. Returns how many were released."""
+    batch_size = batch_size or stock_settings()['RELEASE_BATCH_SIZE']
+    released = 0
+    while True:
+        count = release(StockReservation.objects.filter(expires_at__lte=timezone.now()), limit=batch_size)
+        released += count
+        if count < batch_size:
+            return released
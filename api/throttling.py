@@ -0,0 +1,143 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.throttling import BaseThrottle
+
+
+logger = logging.getLogger('api.throttling')
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SHARED_CACHE': None,
+    'LOCAL_MAX_BUCKETS': 10000,
+    'KEY_PREFIX': 'throttle',
+    'POLICIES': {
+        'default': {'ip': (120, 600), 'user': (120, 600)},
+    },
+}
+
+
+def throttle_settings():
+    return {**DEFAULTS, **getattr(settings, 'THROTTLING', {})}
+
+
+def take_token(state, capacity, rate, now):
+    """
+    Refill a bucket that holds at most ``capacity`` tokens at ``rate`` tokens
+    a second and try to take one. Returns ``(allowed, new_state, wait)``
+    where ``wait`` is the seconds until the next token when refused.
+    """
+    tokens, updated = state if state is not None else (capacity, now)
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return True, (tokens - 1, now), 0
+    return False, (tokens, now), (1 - tokens) / rate
+
+
+#in-process buckets, bounded like an lru so idle clients age out
+class LocalBucketStore:
+    def __init__(self, max_buckets):
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        with self._lock:
+            allowed, state, wait = take_token(self._buckets.get(key), capacity, rate, time.monotonic())
+            self._buckets[key] = state
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return allowed, wait
+
+
+class SharedBucketStore:
+    """
+    Buckets kept in a cache shared by all workers. The read-modify-write is
+    not atomic, so bursts racing on one key can get a few extra tokens; that
+    is fine for abuse limits. Keys expire once a bucket would be full again.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def take(self, key, capacity, rate):
+        allowed, state, wait = take_token(self.cache.get(key), capacity, rate, time.time())
+        self.cache.set(key, state, timeout=math.ceil(capacity / rate) + 1)
+        return allowed, wait
+
+
+class Buckets:
+    """Token buckets in the shared store, falling back to this process when it is down or not configured."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        config = throttle_settings()
+        self.local = LocalBucketStore(config['LOCAL_MAX_BUCKETS'])
+        alias = config['SHARED_CACHE']
+        self.shared = SharedBucketStore(caches[alias]) if alias else None
+
+    def take(self, key, capacity, rate):
+        if self.shared is not None:
+            try:
+                return self.shared.take(key, capacity, rate)
+            except Exception:
+                logger.warning('shared throttle store unavailable, using local buckets', exc_info=True)
+        return self.local.take(key, capacity, rate)
+
+
+buckets = Buckets()
+
+
+@receiver(setting_changed)
+def reset_buckets(setting, **kwargs):
+    if setting in ('THROTTLING', 'CACHES'):
+        buckets.reset()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token buckets per client IP, per user and per route. The policy is looked
+    up by route name (``user-verify``) and falls back to ``default``; each
+    maps an identity (``ip``, ``user`` or ``global``) to ``(burst, tokens per
+    minute)``. Everything needed comes from the request and the token claims,
+    so a refused request never reaches the database.
+    """
+
+    def allow_request(self, request, view):
+        config = throttle_settings()
+        self.retry_after = None
+        if not config['ENABLED']:
+            return True
+        match = request.resolver_match
+        route = match.view_name if match else 'unresolved'
+        policy = config['POLICIES'].get(route) or config['POLICIES']['default']
+        for identity, (capacity, per_minute) in policy.items():
+            ident = self.identify(request, identity)
+            if ident is None:
+                continue
+            allowed, wait = buckets.take(f"{config['KEY_PREFIX']}:{route}:{identity}:{ident}", capacity, per_minute / 60)
+            if not allowed:
+                self.retry_after = wait
+                return False
+        return True
+
+    def identify(self, request, identity):
+        if identity == 'ip':
+            return self.get_ident(request)
+        if identity == 'user':
+            user = request.user
+            return user.pk if user and user.is_authenticated else None
+        return 'all'
+
+    def wait(self):
+        return self.retry_after
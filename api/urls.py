@@ -17,7 +17,11 @@ from .views import (
     FavoriteViewSet,
     ReviewViewSet,
     SupportRequestViewSet,
+    ExportViewSet,
+    ImportJobViewSet,
+    AnalyticsViewSet,
 )
+from .async_views import AsyncItemView, AsyncReviewView
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='user')
@@ -28,6 +32,9 @@ router.register(r'carts', CartViewSet, basename='cart')
 router.register(r'favorites', FavoriteViewSet, basename='favorite')
 router.register(r'reviews', ReviewViewSet)
 router.register(r'support-requests', SupportRequestViewSet)
+router.register(r'exports', ExportViewSet, basename='export')
+router.register(r'import-jobs', ImportJobViewSet, basename='import-job')
+router.register(r'analytics', AnalyticsViewSet, basename='analytics')
 
 
 verification = [
@@ -37,4 +44,13 @@ verification = [
 ]
 
 
-urlpatterns = (router.urls + verification)
+#asgi-native read paths for the catalog
+async_catalog = [
+    path("async/items/", AsyncItemView.as_view(), name='async-item-list'),
+    path("async/items/<int:pk>/", AsyncItemView.as_view(), name='async-item-detail'),
+    path("async/reviews/", AsyncReviewView.as_view(), name='async-review-list'),
+    path("async/reviews/<int:pk>/", AsyncReviewView.as_view(), name='async-review-detail'),
+]
+
+
+urlpatterns = (router.urls + verification + async_catalog)
@@ -4,10 +4,30 @@ from rest_framework import status, viewsets
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, AllowAny
-from .permissions import IsSeller, IsCustomer
+from .permissions import IsSeller, IsCustomer, IsAdminUser
 from django.core.exceptions import PermissionDenied
-from rest_framework.filters import SearchFilter
-from django.core.mail import send_mail
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.db.models import Count, F, Max
+from rest_framework.filters import OrderingFilter
+from rest_framework.settings import api_settings
+
+from .cache import CachedResponseMixin
+from .fieldsets import SparseFieldsetMixin
+from .conditional import ConditionalGetMixin, is_conditional, make_etag, not_modified, serializer_version, set_validators
+from .search import ItemSearchFilter
+from .filters import ItemRatingFilter
+from .ratings import record_rating
+from .mail import queue_email
+from .carts import upsert_lines, apply_operations
+from .analytics import default_start, record_order, seller_dashboard
+from .orders import order_totals
+from .renderers import CSVStreamRenderer, NDJSONStreamRenderer
+from .exports import CONTENT_TYPES, export_filename, stream_export
+from .imports import import_items, import_settings, import_source, read_rows
+from .idempotency import idempotent
+from .stock import OutOfStock, ReservationExpired, consume, release_reservations, reserve, set_stock, stock_level, stock_settings
 
 from .models import(
     User,
@@ -20,6 +40,7 @@ from .models import(
     Favorite,
     Review,
     SupportRequest,
+    ImportJob,
 )
 
 from .serializers import (
@@ -30,13 +51,26 @@ from .serializers import (
     ProfileSerializer,
     ResendVerificationSerializer,
     CartSerializer, 
+    CartOperationSerializer,
+    CartBatchSerializer,
     FavoriteSerializer,
+    FavoriteBatchSerializer,
+    FavoriteLookupSerializer,
     ReviewSerializer,
     SupportRequestSerializer,
+    ExportQuerySerializer,
+    ImportJobSerializer,
+    SalesQuerySerializer,
+    SalesDashboardSerializer,
+    StockSerializer,
 )
 
 
 
+#wrong codes an account may try before it has to ask for a new one
+MAX_VERIFICATION_ATTEMPTS = 5
+
+
 #random verification code
 def generate_verification_code():
     return str(random.randint(100000, 999999))
@@ -44,8 +78,7 @@ def generate_verification_code():
 
 #sending email
 def send_email_verification_code(email, code):
-    print(f'Sending email to: {email}')
-    print(f'Verification code: {code}')
+    queue_email(email, 'Your verification code', f'Your verification code is {code}.')
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -60,6 +93,7 @@ class UserViewSet(viewsets.ModelViewSet):
             user = serializer.save()
             verification_code = generate_verification_code()
             user.verification_code = verification_code
+            user.verification_attempts = 0
             user.save()
             send_email_verification_code(user.email, verification_code)
             return Response({'detail': 'User registered successfully. Please verify your account'}, status=status.HTTP_201_CREATED)
@@ -69,17 +103,23 @@ class UserViewSet(viewsets.ModelViewSet):
     def verify(self, request):
         serializer = VerificationCodeSerializer(data=request.data)
         if serializer.is_valid():
-            code = serializer.validated_data['code']
-            try:
-                user = User.objects.get(verification_code=code)
-                if user.is_verified:
-                    return Response({'detail': 'User already verified.'}, status=status.HTTP_400_BAD_REQUEST)
+            #codes are checked per account, so guesses spread over many addresses still only get a few tries at each
+            pending = User.objects.filter(
+                email=serializer.validated_data['email'], is_verified=False, verification_code__isnull=False,
+            )
+            with transaction.atomic():
+                user = pending.filter(
+                    verification_code=serializer.validated_data['code'],
+                    verification_attempts__lt=MAX_VERIFICATION_ATTEMPTS,
+                ).first()
+                if user is None:
+                    pending.update(verification_attempts=F('verification_attempts') + 1)
+                    pending.filter(verification_attempts__gte=MAX_VERIFICATION_ATTEMPTS).update(verification_code=None)
+                    return Response({'detail': 'Invalid verification code.'}, status=status.HTTP_400_BAD_REQUEST)
                 user.is_verified = True
                 user.verification_code = ''
                 user.save()
-                return Response({'detail': 'User verified successfully.'}, status=status.HTTP_200_OK)
-            except User.DoesNotExist:
-                return Response({'detail': 'Invalid verification code.'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'detail': 'User verified successfully.'}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=False, methods=['post'], url_path='resend-verification')
@@ -93,6 +133,7 @@ class UserViewSet(viewsets.ModelViewSet):
                     return Response({'detail': 'User is already verified.'}, status=status.HTTP_400_BAD_REQUEST)
                 verification_code = generate_verification_code()
                 user.verification_code = verification_code
+                user.verification_attempts = 0
                 user.save()
                 send_email_verification_code(user.email, verification_code)
                 return Response({'detail': 'Verification code resent successfully.'}, status=status.HTTP_200_OK)
@@ -101,12 +142,16 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ItemViewSet(viewsets.ModelViewSet):
+class ItemViewSet(CachedResponseMixin, SparseFieldsetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
+    cache_namespace = 'item'
     queryset = Item.objects.all()
     serializer_class = ItemSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [SearchFilter]
-    search_fields = ['name']
+    filter_backends = [OrderingFilter, ItemSearchFilter, ItemRatingFilter]
+    ordering_fields = ['price', 'rating_average', 'rating_count']
+    page_size = 50
+    expand_lookups = {'seller': 'seller'}
+    fast_list = True
 
     def perform_create(self, serializer):
         if not IsSeller().has_permission(self.request, None):
@@ -125,11 +170,41 @@ class ItemViewSet(viewsets.ModelViewSet):
             raise PermissionDenied('Not authorized')
         instance.delete()
 
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[IsAuthenticated, IsSeller])
+    def bulk_import(self, request):
+        try:
+            upload, fmt = import_source(request)
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if upload.size > import_settings()['SYNC_MAX_BYTES'] or request.query_params.get('background'):
+            job = ImportJob.objects.create(seller_id=request.user.pk, format=fmt, file=upload)
+            return Response(ImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+        try:
+            report = import_items(request.user.pk, read_rows(upload, fmt))
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_200_OK)
 
-class OrderViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get', 'put'], url_path='stock')
+    def stock(self, request, pk=None):
+        item = self.get_object()
+        if request.method == 'PUT':
+            if item.seller_id != request.user.pk:
+                raise PermissionDenied('Not authorized')
+            serializer = StockSerializer(data=request.data, context={'max_shards': stock_settings()['MAX_SHARDS']})
+            serializer.is_valid(raise_exception=True)
+            set_stock(item, serializer.validated_data['on_hand'], serializer.validated_data['shards'])
+        return Response(StockSerializer({'on_hand': stock_level(item), 'shards': item.stock_shards}).data)
+
+
+class OrderViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    page_size = 20
+    cursor_ordering = ('-created_at', '-id')
     queryset = Order.objects.all()
+    field_prefetches = {'order_items': 'order_items'}
+    expand_lookups = {'order_items.item': 'order_items__item'}
 
     def get_queryset(self):
         return Order.objects.filter(customer=self.request.user)
@@ -151,46 +226,107 @@ class CartViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
 
     def list(self, request):
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
+        #the cart's validator is its line count and newest line, a single aggregate
+        if is_conditional(request):
+            validators = (
+                Cart.objects.filter(user=request.user)
+                .annotate(lines=Count('items'), changed=Max('items__updated_at'))
+                .values_list('pk', 'lines', 'changed')
+                .first()
+            )
+            if validators is not None:
+                response = not_modified(request, set_validators(Response(), self.cart_etag(request, *validators)))
+                if response is not None:
+                    return response
+        cart, created = Cart.objects.prefetch_related('items').get_or_create(user=self.request.user)
+        lines = cart.items.all()
+        changed = max((line.updated_at for line in lines), default=None)
         serializer = CartSerializer(cart)
-        return Response(serializer.data)
+        return set_validators(Response(serializer.data), self.cart_etag(request, cart.pk, len(lines), changed))
+
+    def cart_etag(self, request, cart_id, lines, changed):
+        return make_etag(serializer_version(CartSerializer), request.accepted_renderer.format, cart_id, lines, changed)
 
     @action(detail=False, methods=['post'], url_path='add')
+    @idempotent
     def add_to_cart(self, request):
+        serializer = CartOperationSerializer(data={
+            'item_id': request.data.get('item_id'),
+            'quantity': request.data.get('quantity', 1),
+        })
+        serializer.is_valid(raise_exception=True)
+        item_id, quantity = serializer.validated_data['item_id'], serializer.validated_data['quantity']
+        if not Item.objects.filter(pk=item_id).exists():
+            return Response({'detail': 'Item not found'}, status=status.HTTP_404_NOT_FOUND)
         cart, created = Cart.objects.get_or_create(user=request.user)
-        item = Item.objects.get(pk=request.data['item_id'])
-        quantity = request.data.get('quantity', 1)
-        cart_item, created = CartItem.objects.get_or_create(cart=cart, item=item)
-        if not created:
-            cart_item.quantity += quantity
-        else:
-            cart_item.quantity = quantity
-        cart_item.save()
+        upsert_lines(cart.pk, {item_id: quantity}, increment=True)
         return Response({'detail': 'Item added to cart'}, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['post'], url_path='remove')
+    @idempotent
     def remove_from_cart(self, request):
-        cart = Cart.objects.get(user=request.user)
-        item = Item.objects.get(pk=request.data['item_id'])
-        cart_item = CartItem.objects.get(cart=cart, item=item)
-        cart_item.delete()
+        serializer = CartOperationSerializer(data={'op': 'remove', 'item_id': request.data.get('item_id')})
+        serializer.is_valid(raise_exception=True)
+        deleted, _ = CartItem.objects.filter(cart__user=request.user, item_id=serializer.validated_data['item_id']).delete()
+        if not deleted:
+            return Response({'detail': 'Item not in cart'}, status=status.HTTP_404_NOT_FOUND)
         return Response({'detail': 'Item removed from cart'}, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'], url_path='batch')
+    @idempotent
+    def batch(self, request):
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            cart, created = Cart.objects.get_or_create(user=request.user)
+            apply_operations(cart.pk, serializer.validated_data['operations'])
+        return Response({'detail': 'Cart updated'}, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['post'], url_path='create-order')
+    @idempotent
     def create_order(self, request):
-        cart = Cart.objects.get(user=request.user)
-        if not cart.items.exists():
+        lines = list(CartItem.objects.select_related('item').filter(cart__user=request.user))
+        if not lines:
             return Response({'detail': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
-        order = Order.objects.create(customer=request.user)
-        for cart_item in cart.items.all():
-            OrderItem.objects.create(order=order, item=cart_item.item, quantity=cart_item.quantity)
-        cart.items.all().delete()
-        return Response({'detail': 'Order created'}, status=status.HTTP_201_CREATED)
+        try:
+            reservations = reserve(request.user.pk, [(line.item, line.quantity) for line in lines])
+        except OutOfStock as exc:
+            return Response({'detail': 'Not enough stock', 'item_id': exc.item_id}, status=status.HTTP_409_CONFLICT)
+        try:
+            with transaction.atomic():
+                cart_items = list(
+                    CartItem.objects
+                    .select_related('item')
+                    .select_for_update(of=('self',))
+                    .filter(cart__user=request.user)
+                )
+                #the stock was reserved for the lines read above, a cart edited since then needs a fresh checkout
+                if sorted((line.pk, line.quantity) for line in cart_items) != sorted((line.pk, line.quantity) for line in lines):
+                    raise ReservationExpired()
+                consume(reservations)
+                order = Order.objects.create(
+                    customer=request.user,
+                    **order_totals((cart_item.quantity, cart_item.item.price) for cart_item in cart_items),
+                )
+                order_items = OrderItem.objects.bulk_create([
+                    OrderItem(order=order, item=cart_item.item, quantity=cart_item.quantity, unit_price=cart_item.item.price)
+                    for cart_item in cart_items
+                ])
+                record_order(order, order_items)
+                CartItem.objects.filter(pk__in=[cart_item.pk for cart_item in cart_items]).delete()
+        except ReservationExpired:
+            release_reservations(reservations)
+            return Response({'detail': 'Cart changed during checkout, try again'}, status=status.HTTP_409_CONFLICT)
+        except Exception:
+            release_reservations(reservations)
+            raise
+        return Response({'detail': 'Order created', 'order_id': order.pk}, status=status.HTTP_201_CREATED)
 
 
 class FavoriteViewSet(viewsets.ModelViewSet):
     serializer_class = FavoriteSerializer
     permission_classes = [IsAuthenticated]
+    page_size = 100
 
     def get_queryset(self):
         return Favorite.objects.filter(user=self.request.user)
@@ -218,14 +354,121 @@ class FavoriteViewSet(viewsets.ModelViewSet):
             return Response({'detail': 'Item unmarked as favorite'}, status=status.HTTP_204_NO_CONTENT)
         return Response({'detail': 'Item was not marked as favorite'}, status=status.HTTP_404_NOT_FOUND)
 
-
-class ReviewViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'], url_path='contains')
+    def contains(self, request):
+        #one probe of the (user, item) unique index answers a whole catalog page
+        serializer = FavoriteLookupSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        favorited = (
+            Favorite.objects
+            .filter(user=request.user, item_id__in=serializer.validated_data['items'])
+            .values_list('item_id', flat=True)
+        )
+        return Response({'favorited': sorted(favorited)}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='bulk-mark')
+    def bulk_mark(self, request):
+        serializer = FavoriteBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        item_ids = set(serializer.validated_data['item_ids'])
+        found = set(Item.objects.filter(pk__in=item_ids).values_list('pk', flat=True))
+        missing = sorted(item_ids - found)
+        if missing:
+            return Response({'detail': 'Item not found', 'item_ids': missing}, status=status.HTTP_404_NOT_FOUND)
+        #rows already there are skipped by the unique constraint, so repeats and races are harmless
+        Favorite.objects.bulk_create(
+            [Favorite(user=request.user, item_id=item_id) for item_id in sorted(item_ids)], ignore_conflicts=True,
+        )
+        return Response({'detail': 'Items marked as favorite', 'item_ids': sorted(item_ids)}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='bulk-unmark')
+    def bulk_unmark(self, request):
+        serializer = FavoriteBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        deleted, _ = Favorite.objects.filter(user=request.user, item_id__in=serializer.validated_data['item_ids']).delete()
+        return Response({'detail': 'Items unmarked as favorite', 'unmarked': deleted}, status=status.HTTP_200_OK)
+
+
+class ReviewViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    page_size = 50
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        review = serializer.save(user=self.request.user)
+        record_rating(review.item_id, added=review.rating)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        old_item_id, old_rating = serializer.instance.item_id, serializer.instance.rating
+        review = serializer.save()
+        if review.item_id != old_item_id:
+            record_rating(old_item_id, removed=old_rating)
+            record_rating(review.item_id, added=review.rating)
+        elif review.rating != old_rating:
+            record_rating(review.item_id, added=review.rating, removed=old_rating)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+        record_rating(instance.item_id, removed=instance.rating)
+
+
+class ImportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = ImportJobSerializer
+    permission_classes = [IsAuthenticated]
+    cursor_ordering = ('-created_at', '-id')
+
+    def get_queryset(self):
+        return ImportJob.objects.filter(seller=self.request.user)
+
+
+class AnalyticsViewSet(viewsets.ViewSet):
+    permission_classes = [IsAuthenticated, IsSeller]
+
+    @action(detail=False, methods=['get'])
+    def sales(self, request):
+        serializer = SalesQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        period = serializer.validated_data['period']
+        end = serializer.validated_data.get('end') or timezone.localdate()
+        start = serializer.validated_data.get('start') or default_start(end, period)
+        dashboard = seller_dashboard(request.user.pk, period, start, end, top=serializer.validated_data['top'])
+        return Response(SalesDashboardSerializer(dashboard).data)
+
+
+class ExportViewSet(viewsets.ViewSet):
+    """
+    Streaming CSV/NDJSON dumps for accounting. Staff export everything and may
+    filter by ``seller``; sellers only ever get rows for their own items.
+    """
+    permission_classes = [IsAuthenticated, IsSeller | IsAdminUser]
+    #the body is streamed below; these only let Accept: text/csv and friends through negotiation
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, CSVStreamRenderer, NDJSONStreamRenderer]
+
+    def export(self, request, name):
+        serializer = ExportQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        filters = dict(serializer.validated_data)
+        output, gzip = filters.pop('output'), filters.pop('gzip')
+        if not request.user.is_staff:
+            filters['seller'] = request.user.pk
+        response = StreamingHttpResponse(
+            stream_export(name, output, gzip, **filters),
+            content_type='application/gzip' if gzip else CONTENT_TYPES[output],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{export_filename(name, output, gzip)}"'
+        return response
+
+    @action(detail=False, methods=['get'])
+    def orders(self, request):
+        return self.export(request, 'orders')
+
+    @action(detail=False, methods=['get'])
+    def items(self, request):
+        return self.export(request, 'items')
 
 
 class SupportRequestViewSet(viewsets.ModelViewSet):
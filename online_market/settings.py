@@ -10,9 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
+from .database import database_from_env
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -47,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.PerformanceMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,11 +64,27 @@ MIDDLEWARE = [
 #rest framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api.throttling.TokenBucketThrottle',
+    ),
+    # reverse proxies in front of the app; unset, DRF keys throttles on the client-supplied X-Forwarded-For
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
 }
 
 #simple jwt
@@ -71,6 +92,107 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
     'ACCESS_TOKEN_LIFETIME': timedelta(days=7),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7), 
+    'TOKEN_OBTAIN_SERIALIZER': 'api.authentication.ClaimsTokenObtainPairSerializer',
+}
+
+#token revocation versions, see api.authentication
+TOKEN_AUTH = {
+    # alias from CACHES shared by all workers, e.g. a redis cache; revocations then apply everywhere at once
+    'SHARED_CACHE': None,
+    # without a shared cache, how long another worker may still accept a revoked token
+    'LOCAL_VERSION_TIMEOUT': 5,
+}
+
+
+#per-route request metrics, scraped from /metrics
+PERF_METRICS = {
+    'ENABLED': True,
+    'SLOW_REQUEST_MS': 500,
+    'SLOW_REQUEST_TOP_SQL': 3,
+    # client addresses allowed to read /metrics, loopback only by default; add the
+    # scraper's address (as REMOTE_ADDR sees it) to open it up, or None for anyone
+    'ALLOWED_IPS': ['127.0.0.1', '::1'],
+}
+
+
+#json codec for renderers and parsers: 'auto' uses orjson when installed, else the stdlib
+JSON_CODEC = {
+    'BACKEND': 'auto',
+}
+
+
+#response compression, brotli when the module is installed and the client accepts it, else gzip
+COMPRESSION = {
+    'ENABLED': True,
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+}
+
+
+#token bucket throttling, policies are keyed by route name
+THROTTLING = {
+    'ENABLED': True,
+    # alias from CACHES shared by all workers; None, or the cache being down, keeps buckets per-process
+    'SHARED_CACHE': None,
+    'LOCAL_MAX_BUCKETS': 10000,
+    # identity ('ip', 'user' or 'global') -> (burst, tokens refilled per minute)
+    'POLICIES': {
+        'default': {'ip': (120, 600), 'user': (120, 600)},
+        'user-register': {'ip': (10, 10)},
+        # each account also gets only a few guesses at a code, see UserViewSet.verify
+        'user-verify': {'ip': (5, 5)},
+        'user-resend-verification': {'ip': (3, 3)},
+    },
+}
+
+
+#bulk item import, uploads over SYNC_MAX_BYTES run as a background job
+ITEM_IMPORT = {
+    'CHUNK_SIZE': 500,
+    'SYNC_MAX_BYTES': 1024 * 1024,
+    'MAX_ERRORS': 1000,
+    'LEASE_SECONDS': 300,
+    # runs a job gets, counting ones whose worker died, before it is marked failed
+    'MAX_ATTEMPTS': 3,
+}
+
+
+#stock reservations, a checkout holds units this long; `manage.py release_stock_reservations` returns expired holds
+STOCK = {
+    'RESERVATION_SECONDS': 600,
+    'RELEASE_BATCH_SIZE': 1000,
+    'MAX_SHARDS': 64,
+}
+
+
+#Idempotency-Key on cart writes and checkout; `manage.py purge_idempotency_keys` drops expired keys
+IDEMPOTENCY = {
+    'TTL_SECONDS': 24 * 60 * 60,
+    'WAIT_SECONDS': 10,
+    #must outlast the slowest checkout, a key still running after this is claimed by the next retry
+    'LOCK_SECONDS': 60,
+}
+
+
+#catalog response cache
+CATALOG_CACHE = {
+    'ENABLED': True,
+    'TIMEOUT': 300,
+    'LOCAL_MAX_ENTRIES': 1024,
+    # alias from CACHES shared by all workers, e.g. a redis cache; None keeps it per-process
+    'SHARED_CACHE': None,
+}
+
+
+#outbound email, queued by the api and delivered by `manage.py send_queued_emails`
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'no-reply@online-market.local'
+EMAIL_QUEUE = {
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_SECONDS': 30,
+    'MAX_BACKOFF_SECONDS': 3600,
+    'LEASE_SECONDS': 300,
 }
 
 
@@ -101,11 +223,9 @@ WSGI_APPLICATION = 'online_market.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# configured from DATABASE_URL and friends, see online_market/database.py
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_from_env(os.environ, BASE_DIR),
 }
 
 
@@ -145,6 +265,9 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+#uploads, bulk item import files are kept here until their job has run
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
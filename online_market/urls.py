@@ -20,6 +20,8 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from api.metrics import health_view, metrics_view
+
 
 #swag schema
 schema_view = get_schema_view(
@@ -38,6 +40,8 @@ urlpatterns = [
     path('api/', include('api.urls')),
     path('api/auth/', include('rest_framework.urls')),
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
+    path('health', health_view, name='health'),
 ]
 
 